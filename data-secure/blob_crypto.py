@@ -0,0 +1,136 @@
+"""Chunked, authenticated encryption of files into separate blob files.
+
+A blob is a short header followed by the file in fixed-size chunks, each
+sealed with AES-256-GCM. The nonce of every chunk holds its position and
+whether it is the last one, and the header is authenticated with every
+chunk, so reordered, truncated or spliced blobs fail to decrypt (the
+STREAM construction). Only one chunk is held in memory at a time, and the
+blob is only ever a few bytes per chunk bigger than the file.
+
+    header: MAGIC | chunk size (4 bytes) | nonce prefix (7 bytes)
+    chunk:  AES-GCM(key, nonce prefix | counter (4 bytes) | last flag, data, header)
+"""
+import os
+import secrets
+import struct
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b"SDB1"
+CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024  # refuse headers that would make us buffer more
+TAG_SIZE = 16
+NONCE_PREFIX_SIZE = 7
+HEADER = struct.Struct(f">4sI{NONCE_PREFIX_SIZE}s")
+BLOB_DIR = "vault_blobs"
+
+
+class CorruptBlobError(ValueError):
+    """The blob was modified, truncated, or the key is wrong."""
+
+
+def _nonce(prefix, counter, last):
+    if counter >= 2 ** 32:
+        raise ValueError("File too large for this blob format")
+    return prefix + struct.pack(">IB", counter, 1 if last else 0)
+
+
+def _read_full(stream, size):
+    # Uploaded files and sockets may return short reads before the end
+    parts = []
+    while size > 0:
+        part = stream.read(size)
+        if not part:
+            break
+        parts.append(part)
+        size -= len(part)
+    return b"".join(parts)
+
+
+# 🔒 Encrypt and 🔓 decrypt streams
+def encrypt_stream(source, target, key, chunk_size=CHUNK_SIZE):
+    """Encrypt a readable binary stream into target; returns the plaintext size."""
+    prefix = secrets.token_bytes(NONCE_PREFIX_SIZE)
+    header = HEADER.pack(MAGIC, chunk_size, prefix)
+    aead = AESGCM(key)
+    target.write(header)
+    size = counter = 0
+    current = _read_full(source, chunk_size)
+    while True:
+        # Look one chunk ahead so the last one can be marked as such
+        following = _read_full(source, chunk_size) if len(current) == chunk_size else b""
+        last = not following
+        target.write(aead.encrypt(_nonce(prefix, counter, last), current, header))
+        size += len(current)
+        counter += 1
+        if last:
+            return size
+        current = following
+
+
+def decrypt_stream(source, target, key):
+    """Decrypt a blob stream into target; returns the plaintext size.
+
+    Raises CorruptBlobError on any tampering or a wrong key. Output written
+    before the error must be discarded by the caller.
+    """
+    header = _read_full(source, HEADER.size)
+    try:
+        magic, chunk_size, prefix = HEADER.unpack(header)
+    except Exception:
+        raise CorruptBlobError("Not an encrypted blob") from None
+    if magic != MAGIC or not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise CorruptBlobError("Not an encrypted blob")
+    aead = AESGCM(key)
+    record_size = chunk_size + TAG_SIZE
+    size = counter = 0
+    current = _read_full(source, record_size)
+    while True:
+        following = _read_full(source, record_size) if len(current) == record_size else b""
+        last = not following
+        try:
+            data = aead.decrypt(_nonce(prefix, counter, last), current, header)
+        except InvalidTag:
+            raise CorruptBlobError("Blob failed authentication") from None
+        target.write(data)
+        size += len(data)
+        counter += 1
+        if last:
+            return size
+        current = following
+
+
+# 📁 Blob files
+def blob_path(blob_id, folder=BLOB_DIR):
+    if not blob_id.isalnum():
+        raise ValueError(f"Invalid blob id: {blob_id!r}")
+    return os.path.join(folder, blob_id + ".blob")
+
+
+def write_blob(source, key, folder=BLOB_DIR):
+    """Encrypt source into a new blob file; returns (blob id, plaintext size)."""
+    os.makedirs(folder, exist_ok=True)
+    blob_id = secrets.token_hex(16)
+    path = blob_path(blob_id, folder)
+    try:
+        with open(path + ".tmp", "wb") as f:
+            size = encrypt_stream(source, f, key)
+        os.replace(path + ".tmp", path)
+    except BaseException:
+        if os.path.exists(path + ".tmp"):
+            os.remove(path + ".tmp")
+        raise
+    return blob_id, size
+
+
+def read_blob(blob_id, key, target, folder=BLOB_DIR):
+    with open(blob_path(blob_id, folder), "rb") as f:
+        return decrypt_stream(f, target, key)
+
+
+def delete_blob(blob_id, folder=BLOB_DIR):
+    try:
+        os.remove(blob_path(blob_id, folder))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,127 @@
+"""Bulk Fernet work over a whole vault, fanned out to worker processes.
+
+The caller derives the key once and passes the raw Fernet key; workers only
+run the (CPU-bound) AES and HMAC work over chunks of tokens. Small vaults
+are handled in-process, since starting workers costs more than it saves.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from cryptography.fernet import Fernet, InvalidToken
+
+CHUNK_SIZE = 64        # tokens per task sent to a worker
+INLINE_MAX = 256       # vaults up to this size skip the pool
+MAX_WORKERS = os.cpu_count() or 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process pool shared by every session, started on first use.
+
+    Workers come from a forkserver: a fresh interpreter that has only
+    imported this module. Forking the app itself would copy every
+    session's derived keys into long-lived workers, out of reach of
+    KeyCache.clear(), and forking a threaded server is unsafe. The app
+    names itself __main__ (see main.py) so workers do not re-run the
+    script. Where forkserver is unavailable (Windows) this returns None and
+    the work runs in-process.
+    """
+    global _pool
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return None
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+            _pool = ProcessPoolExecutor(MAX_WORKERS, mp_context=context)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# 🧩 Worker tasks (top-level so they can be pickled)
+def decrypt_chunk(key, tokens):
+    cipher = Fernet(key)
+    results = []
+    for token in tokens:
+        try:
+            results.append(cipher.decrypt(token.encode()).decode())
+        except (InvalidToken, ValueError):
+            results.append(None)
+    return results
+
+
+def rekey_chunk(old_key, new_key, tokens):
+    """New tokens under new_key, or None for each token old_key cannot open."""
+    old_cipher, new_cipher = Fernet(old_key), Fernet(new_key)
+    results = []
+    for token in tokens:
+        try:
+            results.append(new_cipher.encrypt(old_cipher.decrypt(token.encode())).decode())
+        except (InvalidToken, ValueError):
+            results.append(None)
+    return results
+
+
+def _run(task, fixed_args, tokens, on_progress=None, chunk_size=CHUNK_SIZE):
+    total = len(tokens)
+    chunks = [(start, tokens[start:start + chunk_size]) for start in range(0, total, chunk_size)]
+    pool = get_pool() if total > INLINE_MAX else None
+    if pool is not None:
+        try:
+            return _run_on_pool(pool, task, fixed_args, chunks, total, on_progress)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            _reset_pool()
+    results = [None] * total
+    done = 0
+    for start, chunk in chunks:
+        results[start:start + len(chunk)] = task(*fixed_args, chunk)
+        done += len(chunk)
+        if on_progress:
+            on_progress(done, total)
+    return results
+
+
+def _run_on_pool(pool, task, fixed_args, chunks, total, on_progress):
+    results = [None] * total
+    done = 0
+    futures = {pool.submit(task, *fixed_args, chunk): (start, len(chunk)) for start, chunk in chunks}
+    try:
+        for future in as_completed(futures):
+            start, length = futures[future]
+            results[start:start + length] = future.result()
+            done += length
+            if on_progress:
+                on_progress(done, total)
+    finally:
+        for future in futures:
+            future.cancel()
+    return results
+
+
+def decrypt_all(tokens, key, on_progress=None):
+    """Plaintext for every token in order, None where key does not open it."""
+    return _run(decrypt_chunk, (key,), list(tokens), on_progress)
+
+
+def rekey_all(tokens, old_key, new_key, on_progress=None):
+    """Every token re-encrypted under new_key, in order.
+
+    Returns (new tokens, indexes of tokens old_key could not open). The
+    caller should only commit the new tokens when that list is empty.
+    """
+    results = _run(rekey_chunk, (old_key, new_key), list(tokens), on_progress)
+    failed = [index for index, token in enumerate(results) if token is None]
+    return results, failed
@@ -0,0 +1,174 @@
+"""Versioned password hashing and key derivation for the vault.
+
+Every stored hash and every user's encryption-key settings carry the KDF
+name, its cost parameters and a random per-user salt, so parameters can be
+raised later without breaking existing records. Records written before this
+scheme (a bare hex PBKDF2 hash under one shared salt) are still accepted and
+are rehashed on the user's next login.
+
+Pick parameters for this host with:
+
+    python kdf.py --target-ms 50 --write
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import statistics
+import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+KDF_VERSION = 2
+PARAMS_FILE = "kdf_params.json"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# 🕰️ The scheme used before versioned records
+LEGACY_SALT = b"secure_salt_value"
+LEGACY_PARAMS = {"kdf": "pbkdf2_sha256", "iterations": 100000}
+
+# Used until calibrate() has written PARAMS_FILE for this host
+DEFAULT_PARAMS = {"kdf": "scrypt", "n": 2 ** 14, "r": 8, "p": 1}
+KDFS = ("scrypt", "pbkdf2_sha256")
+SCRYPT_MAX_N = 2 ** 20  # 1 GiB of memory at r=8
+
+
+# 🔑 Derivation
+def derive(secret, salt, params, length=KEY_BYTES):
+    """Raw key bytes for a secret (str or bytes) under the given KDF parameters."""
+    if isinstance(secret, str):
+        secret = secret.encode()
+    kdf = params["kdf"]
+    if kdf == "scrypt":
+        n, r, p = params["n"], params["r"], params["p"]
+        # hashlib refuses anything over 32 MiB unless maxmem is raised to fit
+        maxmem = 128 * r * (n + p + 2) + 1024 * 1024
+        return hashlib.scrypt(secret, salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=length)
+    if kdf == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", secret, salt, params["iterations"], dklen=length)
+    raise ValueError(f"Unknown KDF: {kdf!r}")
+
+
+def cost_params(params):
+    """Just the KDF name and cost settings of a record (no salt, hash or version)."""
+    keys = ("kdf", "n", "r", "p") if params["kdf"] == "scrypt" else ("kdf", "iterations")
+    return {key: params[key] for key in keys}
+
+
+def current_params(path=PARAMS_FILE):
+    """Parameters for new hashes: the calibrated ones if present, else DEFAULT_PARAMS."""
+    try:
+        with open(path, "r") as f:
+            params = cost_params(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return dict(DEFAULT_PARAMS)
+    return params if params["kdf"] in KDFS else dict(DEFAULT_PARAMS)
+
+
+def _b64(data):
+    return urlsafe_b64encode(data).decode()
+
+
+# 🧂 Password hashes
+def hash_password(password, params=None):
+    """A versioned hash record with a fresh random salt."""
+    params = cost_params(params or current_params())
+    salt = secrets.token_bytes(SALT_BYTES)
+    return {"v": KDF_VERSION, **params, "salt": _b64(salt), "hash": derive(password, salt, params).hex()}
+
+
+def verify_password(password, record):
+    """True if password matches a stored record, new-style or legacy."""
+    if isinstance(record, str):
+        expected, actual = record, derive(password, LEGACY_SALT, LEGACY_PARAMS).hex()
+    else:
+        salt = urlsafe_b64decode(record["salt"])
+        expected = record["hash"]
+        actual = derive(password, salt, cost_params(record), length=len(bytes.fromhex(expected))).hex()
+    return hmac.compare_digest(actual, expected)
+
+
+def needs_upgrade(record, params=None):
+    """True if a record is legacy or was hashed with other than the current parameters."""
+    if isinstance(record, str) or record.get("v") != KDF_VERSION:
+        return True
+    return cost_params(record) != cost_params(params or current_params())
+
+
+# 🗝️ Encryption-key settings
+def new_key_params(params=None):
+    """Per-user settings for deriving encryption keys from passkeys."""
+    return {"v": KDF_VERSION, **cost_params(params or current_params()),
+            "salt": _b64(secrets.token_bytes(SALT_BYTES))}
+
+
+def fernet_key(passkey, key_params=None):
+    """A Fernet key for passkey; users without key settings keep the legacy scheme."""
+    if key_params is None:
+        return urlsafe_b64encode(derive(passkey, LEGACY_SALT, LEGACY_PARAMS))
+    salt = urlsafe_b64decode(key_params["salt"])
+    return urlsafe_b64encode(derive(passkey, salt, cost_params(key_params)))
+
+
+# ⏱️ Calibration
+def time_params(params, repeats=5):
+    """Median milliseconds for one derivation on this host."""
+    salt = secrets.token_bytes(SALT_BYTES)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        derive(b"calibration password", salt, params)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms=50, kdf="scrypt", repeats=5):
+    """(params, measured ms) for the strongest settings that stay near target_ms.
+
+    scrypt doubles n (its memory and time cost) while the next step would
+    stay under 1.5x the target. PBKDF2 time is linear in the iteration
+    count, so it is scaled from one short run and rounded to thousands.
+    """
+    if kdf == "scrypt":
+        params = {"kdf": "scrypt", "n": 2 ** 10, "r": 8, "p": 1}
+        elapsed = time_params(params, repeats)
+        while params["n"] < SCRYPT_MAX_N:
+            stronger = dict(params, n=params["n"] * 2)
+            stronger_ms = time_params(stronger, repeats)
+            if stronger_ms > target_ms * 1.5:
+                break
+            params, elapsed = stronger, stronger_ms
+            if elapsed >= target_ms:
+                break
+        return params, elapsed
+    if kdf == "pbkdf2_sha256":
+        probe = {"kdf": "pbkdf2_sha256", "iterations": 10000}
+        per_iteration = time_params(probe, repeats) / probe["iterations"]
+        iterations = max(LEGACY_PARAMS["iterations"], round(target_ms / per_iteration, -3))
+        params = {"kdf": "pbkdf2_sha256", "iterations": int(iterations)}
+        return params, time_params(params, repeats)
+    raise ValueError(f"Unknown KDF: {kdf!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark this host and pick KDF parameters for a target latency.")
+    parser.add_argument("--target-ms", type=float, default=50, help="time one password check should take")
+    parser.add_argument("--kdf", choices=KDFS, default="scrypt")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per candidate (median is used)")
+    parser.add_argument("--write", action="store_true", help=f"save the result to {PARAMS_FILE}")
+    args = parser.parse_args(argv)
+
+    params, elapsed = calibrate(args.target_ms, args.kdf, args.repeats)
+    print(json.dumps(params))
+    print(f"{elapsed:.1f} ms per derivation, about {1000 / elapsed:.0f} logins/s per core")
+    if args.write:
+        with open(PARAMS_FILE + ".tmp", "w") as f:
+            json.dump(params, f)
+        os.replace(PARAMS_FILE + ".tmp", PARAMS_FILE)
+        print(f"Saved to {PARAMS_FILE}; existing hashes are upgraded on each user's next login.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,29 @@
 import streamlit as st
 import hashlib
+import hmac
+import io
 import json
-import os
+import secrets
 import time
+from base64 import urlsafe_b64decode
+from collections import OrderedDict
+from datetime import datetime
+from importlib.machinery import ModuleSpec
 from cryptography.fernet import Fernet
-from base64 import urlsafe_b64encode
-from hashlib import pbkdf2_hmac
+from blob_crypto import CorruptBlobError, delete_blob, read_blob, write_blob
+from bulk_crypto import decrypt_all, rekey_all
+from kdf import fernet_key, hash_password, needs_upgrade, new_key_params, verify_password
+from vault_store import create_user, load_user, migrate_legacy, save_user
+
+# Streamlit runs this script as a __main__ module without a spec, which
+# bulk_crypto's worker processes would re-run on start-up; a spec named
+# __main__ tells multiprocessing there is nothing to re-run
+__spec__ = ModuleSpec("__main__", None)
 
 # 🔐 Data information of users
-DATA_FILE = "secure_data.json"
-SALT = b"secure_salt_value"
 LOCKOUT_DURATION = 60
+KEY_CACHE_SIZE = 8     # passkeys whose derived keys are kept per session
+KEY_CACHE_TTL = 300    # seconds a derived key stays usable without re-deriving
 
 # 🧠 Session State initialization
 if "authenticated_user" not in st.session_state:
@@ -22,40 +35,152 @@ if "failed_attempts" not in st.session_state:
 if "lockout_time" not in st.session_state:
     st.session_state.lockout_time = 0
 
-# 📁 Load and Save JSON data
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            return json.load(f)
-    return {}
+if "key_cache" not in st.session_state:
+    st.session_state.key_cache = None
+
+# 🔑 Generate key for encryption (see kdf.py for the salts and parameters)
+def generate_key(passkey, key_params=None):
+    return fernet_key(passkey, key_params)
+
+# 🗝️ Derived-key cache for the logged-in session
+class KeyCache:
+    """Fernet ciphers for the passkeys recently used in one session.
+
+    Deriving a key is deliberately slow (see kdf.py), so repeat encrypts
+    and decrypts with the same passkey reuse the cipher instead. Entries
+    are looked up by an HMAC of the passkey and KDF settings under a random
+    per-cache secret, so the cache never holds the passkey or a plain hash
+    of it. The least recently used entry is evicted past max_size, and
+    entries expire ttl seconds after they were derived. clear() overwrites
+    the derived keys it holds; the copies inside Fernet objects are only
+    dropped, since Python gives no way to wipe immutable bytes.
+    """
+
+    def __init__(self, max_size=KEY_CACHE_SIZE, ttl=KEY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._secret = secrets.token_bytes(32)
+        self._entries = OrderedDict()  # passkey digest -> (expires at, key bytes, cipher)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def cipher(self, passkey, key_params=None):
+        return self._entry(passkey, key_params)[2]
+
+    def key(self, passkey, key_params=None):
+        """The derived Fernet key itself, e.g. to hand to worker processes."""
+        return bytes(self._entry(passkey, key_params)[1])
+
+    def _entry(self, passkey, key_params):
+        now = time.monotonic()
+        self._expire(now)
+        settings = json.dumps(key_params, sort_keys=True).encode()
+        digest = hmac.new(self._secret, settings + b"\0" + passkey.encode(), hashlib.sha256).digest()
+        entry = self._entries.get(digest)
+        if entry is not None:
+            self._entries.move_to_end(digest)
+            return entry
+        key = bytearray(generate_key(passkey, key_params))
+        entry = self._entries[digest] = (now + self.ttl, key, Fernet(bytes(key)))
+        while len(self._entries) > self.max_size:
+            self._discard(next(iter(self._entries)))
+        return entry
+
+    def _expire(self, now):
+        for digest in [d for d, (expires_at, _, _) in self._entries.items() if expires_at <= now]:
+            self._discard(digest)
 
-def save_data(data):
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f)
+    def _discard(self, digest):
+        _, key, _ = self._entries.pop(digest)
+        key[:] = bytes(len(key))
 
-# 🔑 Generate key for encryption
-def generate_key(passkey):
-    key = pbkdf2_hmac('sha256', passkey.encode(), SALT, 100000)
-    return urlsafe_b64encode(key)
+    def clear(self):
+        for digest in list(self._entries):
+            self._discard(digest)
+        self._secret = secrets.token_bytes(32)
 
-# 🧂 Hash password
-def hash_password(password):
-    return hashlib.pbkdf2_hmac('sha256', password.encode(), SALT, 100000).hex()
+
+def user_key_params():
+    # Users registered before per-user key salts have no key_kdf and keep the old scheme
+    return (user_record or {}).get("key_kdf")
+
+def get_cipher(passkey):
+    cache = st.session_state.key_cache
+    if cache is None:
+        return Fernet(generate_key(passkey, user_key_params()))
+    return cache.cipher(passkey, user_key_params())
+
+def get_key(passkey):
+    cache = st.session_state.key_cache
+    if cache is None:
+        return generate_key(passkey, user_key_params())
+    return cache.key(passkey, user_key_params())
+
+def file_key(passkey, key_params):
+    # Raw AES key; every file keeps its own KDF settings in its manifest,
+    # so re-keying the text entries never strands a file
+    cache = st.session_state.key_cache
+    key = cache.key(passkey, key_params) if cache is not None else generate_key(passkey, key_params)
+    return urlsafe_b64decode(key)
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def end_session():
+    if st.session_state.key_cache is not None:
+        st.session_state.key_cache.clear()
+    st.session_state.key_cache = None
+    st.session_state.authenticated_user = None
 
 # 🔒 Encrypt and 🔓 Decrypt text
 def encrypt_text(text, key):
-    cipher = Fernet(generate_key(key))
+    cipher = get_cipher(key)
     return cipher.encrypt(text.encode()).decode()
 
 def decrypt_text(encrypt_text, key):
     try:
-        cipher = Fernet(generate_key(key))
+        cipher = get_cipher(key)
         return cipher.decrypt(encrypt_text.encode()).decode()
     except:
         return None
 
-# 📦 Load stored data
-stored_data = load_data()
+# 📦 Bulk operations over the logged-in user's entries
+def progress_reporter(label):
+    bar = st.progress(0.0, text=label)
+
+    def report(done, total):
+        bar.progress(done / total, text=f"{label} {done}/{total}")
+    return report
+
+def rekey_vault(username, record, old_passkey, new_passkey):
+    """Re-encrypt every entry under new_passkey; all or nothing.
+
+    Returns the number of entries old_passkey could not open. Nothing is
+    changed unless that is zero. The new key also gets fresh per-user KDF
+    settings, which moves legacy users off the shared salt.
+    """
+    new_params = new_key_params()
+    old_key = get_key(old_passkey)
+    new_key = generate_key(new_passkey, new_params)
+    tokens, failed = rekey_all(record["data"], old_key, new_key, progress_reporter("🔁 Re-encrypting"))
+    if failed:
+        return len(failed)
+    # Swap the whole record in one step; save_user persists it with an atomic rename
+    save_user(username, {**record, "key_kdf": new_params, "data": tokens})
+    if st.session_state.key_cache is not None:
+        st.session_state.key_cache.clear()
+    return 0
+
+# 📦 Load only the logged-in user's record (users from the old shared file are moved to shards once)
+migrate_legacy()
+user_record = load_user(st.session_state.authenticated_user) if st.session_state.authenticated_user else None
+if st.session_state.authenticated_user and user_record is None:
+    end_session()
 
 # 🎨 Streamlit UI
 st.title("🔐 Secure Data Encryption System")
@@ -63,6 +188,10 @@ st.title("🔐 Secure Data Encryption System")
 menu = ["🏠 Home", "📝 Register", "🔓 Login", "📥 Store Data", "📤 Retrieve Data"]
 choice = st.sidebar.selectbox("📍 Navigation Menu", menu)
 
+if st.session_state.authenticated_user:
+    st.sidebar.write(f"👤 Logged in as **{st.session_state.authenticated_user}**")
+    st.sidebar.button("🚪 Logout", on_click=end_session)
+
 # 🏠 Home Page
 if choice == "🏠 Home":
     st.subheader("👋 Welcome to the Data Encryption System!")
@@ -84,14 +213,14 @@ elif choice == "📝 Register":
 
     if st.button("✅ Register"):
         if username and password:
-            if username in stored_data:
+            created = create_user(username, {
+                "password": hash_password(password),
+                "key_kdf": new_key_params(),
+                "data": []
+            })
+            if not created:
                 st.warning("⚠️ User already exists!")
             else:
-                stored_data[username] = {
-                    "password": hash_password(password),
-                    "data": []
-                }
-                save_data(stored_data)
                 st.success("🎉 User registered successfully!")
         else:
             st.error("❌ Both fields are required.")
@@ -109,8 +238,16 @@ elif choice == "🔓 Login":
     password = st.text_input("🔑 Password", type="password")
 
     if st.button("🔓 Login"):
-        if username in stored_data and stored_data[username]["password"] == hash_password(password):
+        record = load_user(username) if username else None
+        if record is not None and verify_password(password, record["password"]):
+            # 🔁 Rehash with this host's current KDF settings while the password is at hand
+            if needs_upgrade(record["password"]):
+                record["password"] = hash_password(password)
+                save_user(username, record)
+            end_session()
             st.session_state.authenticated_user = username
+            user_record = record
+            st.session_state.key_cache = KeyCache()
             st.session_state.failed_attempts = 0
             st.success(f"✅ Welcome, {username}! 😊")
         else:
@@ -135,23 +272,46 @@ elif choice == "📥 Store Data":
         if st.button("🔐 Encrypt and Save"):
             if data and passkey:
                 encrypted = encrypt_text(data, passkey)
-                stored_data[st.session_state.authenticated_user]["data"].append(encrypted)
-                save_data(stored_data)
+                user_record["data"].append(encrypted)
+                save_user(st.session_state.authenticated_user, user_record)
                 st.success("✅ Data encrypted and saved successfully! 🔒")
             else:
                 st.error("❌ All fields are required.")
 
+        st.subheader("📎 Store Encrypted File")
+        uploaded_file = st.file_uploader("📁 Choose a file to encrypt")
+        file_passkey = st.text_input("🔑 File Passkey", type="password")
+
+        if st.button("🔐 Encrypt and Save File"):
+            if uploaded_file is not None and file_passkey:
+                # The file goes to its own blob; the user record only gets this manifest
+                key_params = new_key_params()
+                blob_id, size = write_blob(uploaded_file, file_key(file_passkey, key_params))
+                user_record.setdefault("files", []).append({
+                    "blob": blob_id,
+                    "name": uploaded_file.name,
+                    "type": uploaded_file.type or "application/octet-stream",
+                    "size": size,
+                    "key_kdf": key_params,
+                    "stored": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                })
+                save_user(st.session_state.authenticated_user, user_record)
+                st.success(f"✅ {uploaded_file.name} ({format_size(size)}) encrypted and saved! 🔒")
+            else:
+                st.error("❌ Choose a file and enter a passkey.")
+
 # 📤 Retrieve Data
 elif choice == "📤 Retrieve Data":
     if not st.session_state.authenticated_user:
         st.warning("🔐 Please login first to access this feature.")
     else:
         st.subheader("📤 Retrieve Your Encrypted Data")
-        user_data = stored_data.get(st.session_state.authenticated_user, {}).get("data", [])
+        user_data = user_record.get("data", [])
+        user_files = user_record.get("files", [])
 
-        if not user_data:
+        if not user_data and not user_files:
             st.info("ℹ️ No encrypted data found.")
-        else:
+        elif user_data:
             st.write("📋 Encrypted Data Entries:")
             for i, item in enumerate(user_data):
                 st.code(item, language="text")
@@ -166,3 +326,71 @@ elif choice == "📤 Retrieve Data":
                     st.text_area("🔓 Decrypted Data:", value=result, height=150)
                 else:
                     st.error("❌ Incorrect passkey or corrupted data.")
+
+            st.subheader("🗂️ All Entries")
+            bulk_passkey = st.text_input("🔑 Passkey for All Entries", type="password")
+
+            if st.button("🔓 Decrypt All"):
+                if bulk_passkey:
+                    results = decrypt_all(user_data, get_key(bulk_passkey), progress_reporter("🔓 Decrypting"))
+                    opened = sum(result is not None for result in results)
+                    st.success(f"✅ Decrypted {opened} of {len(results)} entries.")
+                    for i, result in enumerate(results, start=1):
+                        if result is None:
+                            st.write(f"🔒 Entry {i}: not encrypted with this passkey.")
+                        else:
+                            st.text_area(f"🔓 Entry {i}", value=result, height=100)
+                else:
+                    st.error("❌ Enter the passkey first.")
+
+            new_passkey = st.text_input("🆕 New Passkey", type="password")
+            confirm_passkey = st.text_input("🆕 Confirm New Passkey", type="password")
+
+            if st.button("🔁 Re-key All"):
+                if not (bulk_passkey and new_passkey):
+                    st.error("❌ Enter the current and the new passkey.")
+                elif new_passkey != confirm_passkey:
+                    st.error("❌ The new passkeys do not match.")
+                else:
+                    failed = rekey_vault(st.session_state.authenticated_user, user_record, bulk_passkey, new_passkey)
+                    if failed:
+                        st.error(f"❌ {failed} entries are not encrypted with this passkey. Nothing was changed.")
+                    else:
+                        st.success(f"✅ Re-encrypted {len(user_data)} entries with the new passkey. 🔒")
+
+        if user_files:
+            st.subheader("📎 Encrypted Files")
+            labels = [f"{i}. {manifest['name']} ({format_size(manifest['size'])}, {manifest['stored']})"
+                      for i, manifest in enumerate(user_files, start=1)]
+            selected = labels.index(st.selectbox("📁 File", labels))
+            manifest = user_files[selected]
+            file_passkey = st.text_input("🔑 File Passkey", type="password")
+
+            decrypt_col, delete_col = st.columns(2)
+            with decrypt_col:
+                decrypt_file = st.button("🔓 Decrypt File")
+            with delete_col:
+                delete_file = st.button("🗑️ Delete File")
+
+            if decrypt_file:
+                if file_passkey:
+                    # Decrypted chunk by chunk, and only offered once every chunk has
+                    # authenticated; st.download_button needs the whole file in memory
+                    output = io.BytesIO()
+                    try:
+                        read_blob(manifest["blob"], file_key(file_passkey, manifest["key_kdf"]), output)
+                    except (CorruptBlobError, FileNotFoundError):
+                        st.error("❌ Incorrect passkey or corrupted file.")
+                    else:
+                        st.success("✅ Decryption Successful!")
+                        st.download_button("💾 Download Decrypted File", data=output.getvalue(),
+                                           file_name=manifest["name"], mime=manifest["type"])
+                else:
+                    st.error("❌ Enter the file's passkey.")
+
+            if delete_file:
+                # Drop the manifest first: a crash then leaves an orphan blob, never a dangling entry
+                user_files.remove(manifest)
+                save_user(st.session_state.authenticated_user, user_record)
+                delete_blob(manifest["blob"])
+                st.success(f"🗑️ Deleted {manifest['name']}.")
@@ -0,0 +1,88 @@
+"""Per-user vault storage: one small JSON shard per user.
+
+Saving a user rewrites only that user's shard, and a request only ever
+reads the shard of the user it is about, so I/O and memory stay
+proportional to one user's data however many users register. Shards are
+named after a hash of the username, which keeps arbitrary usernames out of
+file paths. Every write goes to a temporary file that is then renamed over
+the shard, so readers see either the old or the new record, never a mix.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+VAULT_DIR = "vault_users"
+LEGACY_FILE = "secure_data.json"  # the single file every user used to share
+
+
+def shard_path(username, folder=VAULT_DIR):
+    digest = hashlib.sha256(username.encode()).hexdigest()
+    return os.path.join(folder, digest + ".json")
+
+
+def load_user(username, folder=VAULT_DIR):
+    """The user's record, or None if there is no such user."""
+    try:
+        with open(shard_path(username, folder), "r") as f:
+            return json.load(f)["record"]
+    except FileNotFoundError:
+        return None
+
+
+def _write_temp(username, record, folder):
+    os.makedirs(folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"username": username, "record": record}, f)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def save_user(username, record, folder=VAULT_DIR):
+    """Atomically replace the user's shard with record."""
+    temp_path = _write_temp(username, record, folder)
+    os.replace(temp_path, shard_path(username, folder))
+
+
+def create_user(username, record, folder=VAULT_DIR):
+    """Write a new user's shard; False if the username is already taken.
+
+    Linking the finished temporary file into place fails if the shard
+    exists, so two concurrent registrations cannot both win.
+    """
+    temp_path = _write_temp(username, record, folder)
+    try:
+        os.link(temp_path, shard_path(username, folder))
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(temp_path)
+    return True
+
+
+def migrate_legacy(legacy_file=LEGACY_FILE, folder=VAULT_DIR):
+    """Split the old all-users file into shards, once; returns the users moved.
+
+    Users that already have a shard are left alone. The old file is kept,
+    renamed with a .migrated suffix, as a backup.
+    """
+    try:
+        with open(legacy_file, "r") as f:
+            users = json.load(f)
+    except FileNotFoundError:
+        return 0
+    moved = 0
+    for username, record in users.items():
+        if create_user(username, record, folder):
+            moved += 1
+    try:
+        os.replace(legacy_file, legacy_file + ".migrated")
+    except FileNotFoundError:
+        pass  # another session finished the same migration first
+    return moved
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Where downloaded assets are kept between runs
+CACHE_DIR = ".asset_cache"
+CACHE_TTL = 7 * 24 * 60 * 60  # seconds before a cached asset is revalidated
+FETCH_TIMEOUT = 3             # seconds; a slow network must never hang a rerun
+
+
+def http_get(url, headers, timeout):
+    """Default fetcher. Returns (status_code, headers, body bytes)."""
+    import requests
+    r = requests.get(url, headers=headers, timeout=timeout)
+    return r.status_code, r.headers, r.content
+
+
+class AssetCache:
+    """Memory + disk cache for JSON assets fetched over HTTP.
+
+    get_json() never waits on the network: it returns the freshest copy it has
+    (memory, disk, then the bundled fallback) and refreshes stale entries on a
+    background thread using ETag revalidation.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL, timeout=FETCH_TIMEOUT, fetch=http_get):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.timeout = timeout
+        self.fetch = fetch
+        self.memory = {}     # url -> (data, meta)
+        self.refreshing = {}  # url -> Thread
+        self.lock = threading.Lock()
+
+    def _paths(self, url):
+        name = hashlib.sha256(url.encode()).hexdigest()
+        return (os.path.join(self.cache_dir, f"{name}.json"),
+                os.path.join(self.cache_dir, f"{name}.meta.json"))
+
+    def _read_disk(self, url):
+        data_path, meta_path = self._paths(url)
+        try:
+            with open(data_path, "r") as file:
+                data = json.load(file)
+            with open(meta_path, "r") as file:
+                meta = json.load(file)
+            return data, meta
+        except (OSError, ValueError):
+            return None
+
+    def _write_json(self, path, value):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(value, file)
+        os.replace(tmp_path, path)
+
+    def _write_disk(self, url, data, meta):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path, meta_path = self._paths(url)
+        if data is not None:
+            self._write_json(data_path, data)
+        self._write_json(meta_path, meta)
+
+    def _is_fresh(self, meta):
+        return time.time() - meta.get("fetched_at", 0) < self.ttl
+
+    def refresh(self, url):
+        """Fetch url now (blocking, bounded by the timeout). Returns the data or None."""
+        with self.lock:
+            cached = self.memory.get(url) or self._read_disk(url)
+        headers = {}
+        if cached and cached[1].get("etag"):
+            headers["If-None-Match"] = cached[1]["etag"]
+        try:
+            status, response_headers, body = self.fetch(url, headers, self.timeout)
+        except Exception:
+            return None
+        if status == 304 and cached:
+            data = cached[0]
+            meta = dict(cached[1], fetched_at=time.time())
+            self._write_disk(url, None, meta)
+        elif status == 200:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return None
+            meta = {"url": url, "etag": response_headers.get("ETag"), "fetched_at": time.time()}
+            self._write_disk(url, data, meta)
+        else:
+            return None
+        with self.lock:
+            self.memory[url] = (data, meta)
+        return data
+
+    def _refresh_in_background(self, url):
+        with self.lock:
+            thread = self.refreshing.get(url)
+            if thread is not None and thread.is_alive():
+                return thread
+            thread = threading.Thread(target=self.refresh, args=(url,), daemon=True)
+            self.refreshing[url] = thread
+        thread.start()
+        return thread
+
+    def get_json(self, url, fallback_path=None):
+        with self.lock:
+            cached = self.memory.get(url)
+        if cached is None:
+            cached = self._read_disk(url)
+            if cached is not None:
+                with self.lock:
+                    self.memory[url] = cached
+        if cached is not None:
+            if not self._is_fresh(cached[1]):
+                self._refresh_in_background(url)
+            return cached[0]
+
+        self._refresh_in_background(url)
+        return load_fallback(fallback_path)
+
+
+_fallbacks = {}
+
+
+def load_fallback(path):
+    if path is None:
+        return None
+    if path not in _fallbacks:
+        try:
+            with open(path, "r") as file:
+                _fallbacks[path] = json.load(file)
+        except (OSError, ValueError):
+            _fallbacks[path] = None
+    return _fallbacks[path]
+
+
+# Shared by every rerun and session of the app process
+asset_cache = AssetCache()
@@ -0,0 +1,307 @@
+"""Scalability benchmark for the library manager's core operations.
+
+Runs headlessly (no Streamlit) against synthetic libraries and writes the
+results as JSON so runs from different commits can be compared:
+
+    python benchmark.py --sizes 1000 100000 1000000 --output bench.json
+    python benchmark.py --sizes 1000 100000 --compare bench.json
+
+--imports times cold imports instead, each in a fresh interpreter:
+
+    python benchmark.py --imports --output imports.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from library_core import (JournalStorage, JsonStorage, LibraryStats, SearchIndex, SimilarityIndex, SqliteStorage,
+                          WriteBehindQueue, new_book_id)
+
+GENRES = ["Fiction", "Non-Fiction", "Science", "Technology", "Romance", "Poetry",
+          "Self-help", "Art", "Religion", "History", "Other"]
+BACKENDS = {
+    "sqlite": lambda folder: SqliteStorage(os.path.join(folder, "library.db")),
+    "json": lambda folder: JsonStorage(os.path.join(folder, "library.json"),
+                                       os.path.join(folder, "library_stats.json")),
+    "journal": lambda folder: JournalStorage(os.path.join(folder, "library.snapshot.json"),
+                                             os.path.join(folder, "library.journal"),
+                                             os.path.join(folder, "library.json")),
+}
+
+
+# Cold import targets: name -> statement run in a fresh interpreter
+IMPORT_TARGETS = {
+    "library_core": "import library_core",
+    "core_crud": "from library_core import LibraryStats, QueryIndex, SearchIndex, get_shared_store, get_storage",
+    "core_import_export": "from library_core import import_books, write_export",
+    "core_dedup_numpy": "from library_core import DuplicateIndex; DuplicateIndex([{'title': 'a', 'author': 'b'}])",
+    "core_frame_pandas": "from library_core import LibraryFrame; LibraryFrame().frame",
+    # What librarymanager.py used to import up front on every cold start
+    "ui_eager_stack": "import streamlit, pandas, plotly.express, plotly.graph_objects, streamlit_lottie",
+}
+
+
+# Synthetic data
+def make_words(rng, count):
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(count)]
+
+
+def make_library(size, seed=42):
+    rng = random.Random(seed)
+    words = make_words(rng, max(1000, min(size // 5, 50000)))
+    authors = [f"{rng.choice(words).title()} {rng.choice(words).title()}" for _ in range(max(100, size // 20))]
+    return [
+        {
+            "id": new_book_id(),
+            "title": " ".join(rng.choices(words, k=rng.randint(1, 5))).title(),
+            "author": rng.choice(authors),
+            "publication_year": rng.randint(1800, 2025),
+            "genre": rng.choice(GENRES),
+            "read_status": rng.random() < 0.4,
+            "added_date": "2025-01-01 00:00:00",
+        }
+        for _ in range(size)
+    ], words, authors
+
+
+# Measurement helpers
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, peak_bytes):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        "samples": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "throughput_ops": len(latencies) / total if total else 0.0,
+        "peak_mem_mb": peak_bytes / (1024 * 1024) if peak_bytes is not None else None,
+    }
+
+
+def measure(op, timed_args, memory_args=(), trace_memory=True):
+    """Time op(*args) for every entry of timed_args, then trace peak memory
+    over memory_args in a separate pass so tracing does not skew latencies."""
+    latencies = []
+    for args in timed_args:
+        start = time.perf_counter()
+        op(*args)
+        latencies.append(time.perf_counter() - start)
+    peak = None
+    if trace_memory and memory_args:
+        tracemalloc.start()
+        for args in memory_args:
+            op(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return summarize(latencies, peak)
+
+
+# Benchmarks (each mirrors what the matching librarymanager.py function does)
+def bench_size(size, backend, samples, trace_memory):
+    books, words, authors = make_library(size)
+    rng = random.Random(size)
+    folder = tempfile.mkdtemp(prefix="library-bench-")
+    memory_samples = max(1, samples // 10)
+    results = {}
+    state = {}
+    try:
+        def save_library():
+            storage = BACKENDS[backend](folder)
+            storage.replace_all(books)
+            storage.close()
+
+        results["save_library"] = measure(save_library, [()], [()], trace_memory)
+
+        def load_library():
+            if "storage" in state:
+                state["storage"].close()
+            storage = BACKENDS[backend](folder)
+            loaded = storage.load()
+            state.update(storage=storage, library={book["id"]: book for book in loaded},
+                         index=SearchIndex(loaded), stats=storage.load_stats())
+
+        results["load_library"] = measure(load_library, [()], [()], trace_memory)
+        storage, library, index, stats = (state["storage"], state["library"],
+                                          state["index"], state["stats"])
+
+        def add_book(book):
+            storage.insert(book)
+            library[book["id"]] = book
+            index.add(book)
+            stats.add(book)
+
+        new_books, _, _ = make_library(samples + memory_samples, seed=size + 1)
+        results["add_book"] = measure(add_book, [(book,) for book in new_books[:samples]],
+                                      [(book,) for book in new_books[samples:]], trace_memory)
+
+        # What add_book costs the UI now that saving happens in the background
+        queue = WriteBehindQueue(storage)
+
+        def add_book_queued(book):
+            queue.insert(book)
+            library[book["id"]] = book
+            index.add(book)
+            stats.add(book)
+
+        queued_books, _, _ = make_library(samples + memory_samples, seed=size + 2)
+        results["add_book_queued"] = measure(add_book_queued, [(book,) for book in queued_books[:samples]],
+                                             [(book,) for book in queued_books[samples:]], trace_memory)
+        queue.close()
+
+        def remove_book(book_id):
+            book = library.pop(book_id)
+            storage.delete(book)
+            index.remove(book)
+            stats.remove(book)
+
+        # Distinct ids drawn up front, so the memory pass never repeats a removal
+        removed_ids = [(book_id,) for book_id in rng.sample(list(library), min(samples + memory_samples, len(library)))]
+        results["remove_book"] = measure(remove_book, removed_ids[:samples], removed_ids[samples:], trace_memory)
+
+        queries = []
+        for _ in range(samples):
+            kind = rng.random()
+            word = rng.choice(words)
+            if kind < 0.4:
+                queries.append((word, ("title",), 200))
+            elif kind < 0.6:
+                queries.append((word[:3], ("title", "author", "genre"), 200))
+            elif kind < 0.8:
+                queries.append((rng.choice(authors).split()[0].lower(), ("author",), 200))
+            else:
+                typo = word[:1] + "x" + word[2:]
+                queries.append((typo, ("title", "author", "genre"), 200))
+        results["search_books"] = measure(index.search, queries, queries[:memory_samples], trace_memory)
+
+        similarity = {}
+
+        def build_similarity_index():
+            similarity["index"] = SimilarityIndex(list(library.values()))
+
+        results["build_similarity"] = measure(build_similarity_index, [()], [()], trace_memory)
+        remaining = list(library.values())
+        similar_to = [(rng.choice(remaining), 5) for _ in range(samples)]
+        results["similar_books"] = measure(similarity["index"].similar, similar_to,
+                                           similar_to[:memory_samples], trace_memory)
+
+        results["get_library_stats"] = measure(stats.as_dict, [()] * samples, [()], trace_memory)
+
+        # The pure-Python recount get_library_stats() used to do, for reference
+        recounts = [(library.values(),)] * max(1, samples // 100)
+        results["recount_stats"] = measure(LibraryStats.from_books, recounts, recounts[:1], trace_memory)
+    finally:
+        if "storage" in state:
+            state["storage"].close()
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def bench_imports(repeats):
+    """Time each IMPORT_TARGETS statement in `repeats` fresh interpreters."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for name, statement in IMPORT_TARGETS.items():
+        code = ("import time\n_start = time.perf_counter()\n"
+                f"{statement}\nprint(time.perf_counter() - _start)")
+        latencies = []
+        for _ in range(repeats):
+            output = subprocess.check_output([sys.executable, "-c", code], cwd=script_dir, text=True)
+            latencies.append(float(output.strip().splitlines()[-1]))
+        results[name] = summarize(latencies, None)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path):
+    with open(previous_path, "r") as file:
+        previous = json.load(file)
+    print(f"\nCompared with {previous_path} ({previous['meta'].get('commit')}):")
+    for size, operations in current["results"].items():
+        old_operations = previous["results"].get(size, {})
+        for name, summary in operations.items():
+            old = old_operations.get(name)
+            if not old or not old["p50_ms"]:
+                continue
+            ratio = summary["p50_ms"] / old["p50_ms"]
+            flag = "  <-- slower" if ratio > 1.2 else ""
+            print(f"  {size:>9} {name:<18} p50 {old['p50_ms']:10.3f} -> {summary['p50_ms']:10.3f} ms "
+                  f"(x{ratio:.2f}){flag}")
+
+
+def print_results(results):
+    for name, summary in results.items():
+        memory = f"{summary['peak_mem_mb']:8.1f} MB" if summary["peak_mem_mb"] is not None else ""
+        print(f"  {name:<18} p50 {summary['p50_ms']:10.3f} ms  p99 {summary['p99_ms']:10.3f} ms  "
+              f"{summary['throughput_ops']:12.1f} ops/s {memory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="sqlite")
+    parser.add_argument("--samples", type=int, default=200, help="operations timed per benchmark")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass (no peak memory)")
+    parser.add_argument("--imports", action="store_true", help="time cold imports instead of library operations")
+    parser.add_argument("--import-repeats", type=int, default=7, help="fresh interpreters per import target")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "samples": args.samples,
+        },
+        "results": {},
+    }
+    if args.imports:
+        print(f"Timing cold imports ({args.import_repeats} runs each)...")
+        report["results"]["imports"] = bench_imports(args.import_repeats)
+        print_results(report["results"]["imports"])
+    else:
+        for size in args.sizes:
+            print(f"Benchmarking {size} books ({args.backend})...")
+            report["results"][str(size)] = bench_size(size, args.backend, args.samples, not args.no_memory)
+            print_results(report["results"][str(size)])
+    report["meta"]["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import threading
+from collections import OrderedDict
+
+FIGURE_CACHE_SIZE = 64
+
+
+class FigureCache:
+    """Process-wide LRU cache of built Plotly figures.
+
+    Keys carry the chart name plus the exact data it shows, so an unchanged
+    library reuses the figure and a changed one can never get a stale chart.
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.figures = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        with self.lock:
+            figure = self.figures.get(key)
+            if figure is not None:
+                self.figures.move_to_end(key)
+                self.hits += 1
+                return figure
+        figure = build()
+        with self.lock:
+            self.misses += 1
+            self.figures[key] = figure
+            self.figures.move_to_end(key)
+            while len(self.figures) > self.maxsize:
+                self.figures.popitem(last=False)
+        return figure
+
+    def clear(self):
+        with self.lock:
+            self.figures.clear()
+
+
+# Shared by every rerun and session of the app process
+figure_cache = FigureCache()
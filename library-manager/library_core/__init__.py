@@ -0,0 +1,56 @@
+"""Headless core of the library manager: storage, indexes, stats, import/export.
+
+Nothing here imports Streamlit or Plotly, and names are resolved lazily, so
+`from library_core import SearchIndex` only loads the search module. pandas
+(LibraryFrame), numpy (DuplicateIndex), scipy (SimilarityIndex) and pyarrow
+(Parquet export) are only imported once they are actually used.
+"""
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "BOOK_FIELDS": "storage",
+    "LibraryStorage": "storage",
+    "JsonStorage": "storage",
+    "SqliteStorage": "storage",
+    "JournalStorage": "storage",
+    "get_storage": "storage",
+    "migrate_json_to_sqlite": "storage",
+    "LibraryStats": "library_stats",
+    "SearchIndex": "search_index",
+    "SEARCH_FIELDS": "search_index",
+    "QueryIndex": "query_engine",
+    "DuplicateIndex": "dedup",
+    "SimilarityIndex": "recommend",
+    "ImportResult": "bulk_import",
+    "import_books": "bulk_import",
+    "EXPORT_FORMATS": "export",
+    "chunked": "export",
+    "write_export": "export",
+    "WriteBehindQueue": "write_behind",
+    "ConflictError": "shared_store",
+    "LibraryStore": "shared_store",
+    "get_shared_store": "shared_store",
+    "new_book_id": "shared_store",
+    "LibraryFrame": "library_frame",
+    "LibraryIndexes": "library_indexes",
+    "LibraryView": "library_indexes",
+    "to_year": "fields",
+    "YEAR_MIN": "fields",
+    "YEAR_MAX": "fields",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,164 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from .dedup import normalize_author, normalize_title
+from .fields import YEAR_MAX, YEAR_MIN
+
+BATCH_SIZE = 5000
+
+# Column names accepted for each book field (compared lowercased)
+COLUMN_ALIASES = {
+    "title": ("title", "book title", "name"),
+    "author": ("author", "authors", "author l-f"),
+    "publication_year": ("publication_year", "year", "year published", "original publication year"),
+    "genre": ("genre", "genres", "category"),
+    "read_status": ("read_status", "read", "status", "exclusive shelf"),
+}
+GOODREADS_COLUMNS = {"book id", "exclusive shelf", "my rating"}
+TRUE_VALUES = {"1", "true", "yes", "y", "read"}
+
+
+def book_key(title, author):
+    """Normalized (title, author) used to spot duplicates; matches dedup.exact_key."""
+    return (normalize_title(title), normalize_author(author))
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []  # first few (row number, message) pairs
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": self.errors,
+        }
+
+
+# Readers: each yields one dict per row without loading the whole file
+def iter_csv_rows(text_file):
+    reader = csv.DictReader(text_file)
+    if reader.fieldnames is None:
+        return
+    columns = {name.strip().lower(): name for name in reader.fieldnames if name}
+    goodreads = GOODREADS_COLUMNS <= set(columns)
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        if goodreads and field == "publication_year":
+            aliases = ("original publication year", "year published")
+        for alias in aliases:
+            if alias in columns:
+                mapping[field] = columns[alias]
+                break
+    if goodreads:
+        # Goodreads keeps shelves rather than genres
+        mapping.setdefault("genre", columns.get("bookshelves"))
+    for row in reader:
+        yield {field: row.get(column) for field, column in mapping.items() if column}
+
+
+def iter_jsonl_rows(text_file):
+    for line in text_file:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def detect_format(filename):
+    name = filename.lower()
+    if name.endswith(".jsonl") or name.endswith(".ndjson"):
+        return "jsonl"
+    return "csv"
+
+
+def normalize_row(row, added_date=None):
+    """Turn a raw row into a book dict, raising ValueError if it is unusable."""
+    if not isinstance(row, dict):
+        raise ValueError("not a JSON object")
+    title = str(row.get("title") or "").strip()
+    author = str(row.get("author") or "").strip()
+    if not title or not author:
+        raise ValueError("title and author are required")
+    year = str(row.get("publication_year") or "").strip()
+    if year:
+        try:
+            year = int(float(year))
+        except (ValueError, OverflowError):  # OverflowError: "inf", "1e999"
+            raise ValueError(f"invalid publication year: {year!r}") from None
+        if not YEAR_MIN <= year <= YEAR_MAX:
+            raise ValueError(f"publication year out of range: {year}")
+    else:
+        year = None
+    genre = str(row.get("genre") or "").strip()
+    # Multi-valued columns (Goodreads shelves, "a, b") keep their first entry
+    genre = genre.split(",")[0].strip() or "Other"
+    read_status = row.get("read_status")
+    if not isinstance(read_status, bool):
+        read_status = str(read_status or "").strip().lower() in TRUE_VALUES
+    return {
+        "title": title,
+        "author": author,
+        "publication_year": year,
+        "genre": genre,
+        "read_status": read_status,
+        "added_date": added_date or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def import_books(binary_file, filename, storage, existing_books=(), on_batch=None,
+                 batch_size=BATCH_SIZE, max_errors=20):
+    """Stream books from an uploaded CSV/JSONL/Goodreads file into storage.
+
+    Rows are validated, deduplicated against existing_books and the file itself,
+    and committed batch_size at a time. on_batch(books, result) is called after
+    every committed batch so callers can update their in-memory state and progress.
+    """
+    text_file = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    rows = iter_jsonl_rows(text_file) if detect_format(filename) == "jsonl" else iter_csv_rows(text_file)
+    seen = {book_key(book["title"], book["author"]) for book in existing_books}
+    result = ImportResult()
+    added_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    batch = []
+
+    def flush():
+        storage.insert_many(batch)
+        result.imported += len(batch)
+        if on_batch:
+            on_batch(batch, result)
+
+    try:
+        for row in rows:
+            result.rows += 1
+            try:
+                book = normalize_row(row, added_date)
+            except ValueError as e:
+                result.invalid += 1
+                if len(result.errors) < max_errors:
+                    result.errors.append((result.rows, str(e)))
+                continue
+            key = book_key(book["title"], book["author"])
+            if key in seen:
+                result.duplicates += 1
+                continue
+            seen.add(key)
+            batch.append(book)
+            if len(batch) >= batch_size:
+                flush()
+                batch = []
+        if batch:
+            flush()
+    finally:
+        # Leave the uploaded buffer open for the caller
+        text_file.detach()
+    return result
@@ -0,0 +1,260 @@
+import re
+import zlib
+
+# MinHash / LSH settings: 12 bands x 5 rows finds ~90% of pairs at 0.7 Jaccard
+# while keeping unrelated titles out of shared buckets
+NUM_PERM = 60
+BANDS = 12
+ROWS = NUM_PERM // BANDS
+BUILD_CHUNK = 5000       # books hashed per vectorized batch
+NEAR_THRESHOLD = 0.6     # minimum title shingle Jaccard for a near duplicate
+AUTHOR_THRESHOLD = 0.5   # minimum author token Jaccard for a near duplicate
+SHINGLE_SIZE = 3
+
+_PRIME = (1 << 61) - 1
+_hash_params = None  # (numpy, A, B), created on first use so importing stays cheap
+
+ARTICLES = {"the", "a", "an"}
+ONES = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+        "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen",
+        "eighteen", "nineteen"]
+TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+# Normalization
+def _below_hundred(n):
+    if n < 20:
+        return [ONES[n]]
+    words = [TENS[n // 10]]
+    if n % 10:
+        words.append(ONES[n % 10])
+    return words
+
+
+def number_words(n):
+    """English words for 0 <= n < 10000, reading 1100-1999 and 2010-2099 as years."""
+    if n < 100:
+        return _below_hundred(n)
+    if 1100 <= n <= 1999 or 2010 <= n <= 2099:
+        high, low = divmod(n, 100)
+        if low == 0:
+            return _below_hundred(high) + ["hundred"]
+        if low < 10:
+            return _below_hundred(high) + ["oh", ONES[low]]
+        return _below_hundred(high) + _below_hundred(low)
+    words = []
+    if n >= 1000:
+        words += [ONES[n // 1000], "thousand"]
+        n %= 1000
+    if n >= 100:
+        words += [ONES[n // 100], "hundred"]
+        n %= 100
+    if n:
+        words += _below_hundred(n)
+    return words
+
+
+def normalize_tokens(text):
+    tokens = []
+    for token in TOKEN_RE.findall(str(text).lower().replace("&", " and ")):
+        if token.isdigit() and len(token) <= 4:
+            tokens.extend(number_words(int(token)))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def normalize_title(title):
+    tokens = normalize_tokens(title)
+    if len(tokens) > 1 and tokens[0] in ARTICLES:
+        tokens = tokens[1:]
+    return " ".join(tokens)
+
+
+def normalize_author(author):
+    # Order-free, so "Orwell, George" and "George Orwell" agree
+    return " ".join(sorted(normalize_tokens(author)))
+
+
+def exact_key(book):
+    return (normalize_title(book.get("title", "")), normalize_author(book.get("author", "")))
+
+
+# MinHash
+def shingles(text):
+    text = f" {text} "
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def _minhash_params():
+    global _hash_params
+    if _hash_params is None:
+        import numpy as np
+
+        rng = np.random.RandomState(1984)
+        _hash_params = (np,
+                        rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.uint64),
+                        rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.uint64))
+    return _hash_params
+
+
+def minhash_many(shingle_sets):
+    """MinHash signatures (one row per set) computed in a single vectorized pass."""
+    np, _A, _B = _minhash_params()
+    lengths = [len(shingle_set) for shingle_set in shingle_sets]
+    hashes = np.fromiter((zlib.crc32(s.encode()) for shingle_set in shingle_sets for s in shingle_set),
+                         dtype=np.uint64, count=sum(lengths))
+    offsets = np.cumsum([0] + lengths[:-1])
+    values = (np.outer(_A, hashes) + _B[:, None]) % _PRIME
+    return np.minimum.reduceat(values, offsets, axis=1).T
+
+
+def minhash(shingle_set):
+    return minhash_many([shingle_set])[0]
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class DuplicateIndex:
+    """Exact-key hash index plus MinHash/LSH buckets for near-duplicate books."""
+
+    def __init__(self, books=()):
+        self.docs = {}      # doc id -> book
+        self._doc_ids = {}  # id(book) -> doc id
+        self._features = {}  # doc id -> (exact key, title shingles, author tokens, band keys)
+        self._next_id = 0
+        self.exact = {}     # exact key -> set of doc ids
+        self.buckets = {}   # (band, band hash) -> list of doc ids (buckets stay small)
+        self.extend(books)
+
+    def _features_many(self, books):
+        keys = [exact_key(book) for book in books]
+        title_shingles = [shingles(key[0]) for key in keys]
+        signatures = minhash_many(title_shingles)
+        features = []
+        for key, shingle_set, signature in zip(keys, title_shingles, signatures):
+            bands = [(band, signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+            features.append((key, shingle_set, set(key[1].split()), bands))
+        return features
+
+    def _features_for(self, book):
+        return self._features_many([book])[0]
+
+    def add(self, book):
+        return self._add(book, self._features_for(book))
+
+    def extend(self, books):
+        books = list(books)
+        for start in range(0, len(books), BUILD_CHUNK):
+            chunk = books[start:start + BUILD_CHUNK]
+            for book, features in zip(chunk, self._features_many(chunk)):
+                self._add(book, features)
+
+    def _add(self, book, features):
+        doc_id = self._next_id
+        self._next_id += 1
+        self.exact.setdefault(features[0], set()).add(doc_id)
+        buckets = self.buckets
+        for band_key in features[3]:
+            bucket = buckets.get(band_key)
+            if bucket is None:
+                buckets[band_key] = [doc_id]
+            else:
+                bucket.append(doc_id)
+        self.docs[doc_id] = book
+        self._doc_ids[id(book)] = doc_id
+        self._features[doc_id] = features
+        return doc_id
+
+    def remove(self, book):
+        doc_id = self._doc_ids.pop(id(book), None)
+        if doc_id is None:
+            return
+        key, _, _, bands = self._features.pop(doc_id)
+        docs = self.exact[key]
+        docs.discard(doc_id)
+        if not docs:
+            del self.exact[key]
+        for band_key in bands:
+            bucket = self.buckets[band_key]
+            bucket.remove(doc_id)
+            if not bucket:
+                del self.buckets[band_key]
+        del self.docs[doc_id]
+
+    def update(self, old_book, new_book):
+        self.remove(old_book)
+        self.add(new_book)
+
+    def _near(self, features, exclude=(), after=-1):
+        key, title_shingles, author_tokens, bands = features
+        candidates = set()
+        for band_key in bands:
+            bucket = self.buckets.get(band_key)
+            if bucket is not None:
+                candidates.update(bucket)
+        matches = []
+        for doc_id in candidates:
+            if doc_id <= after or doc_id in exclude:
+                continue
+            other_key, other_shingles, other_authors, _ = self._features[doc_id]
+            if other_key == key:
+                continue
+            score = jaccard(title_shingles, other_shingles)
+            if score >= NEAR_THRESHOLD and jaccard(author_tokens, other_authors) >= AUTHOR_THRESHOLD:
+                matches.append((doc_id, score))
+        matches.sort(key=lambda item: -item[1])
+        return matches
+
+    def check(self, book):
+        """Duplicates of a book that is about to be added: {"exact": [...], "near": [(book, score)]}."""
+        features = self._features_for(book)
+        exact = self.exact.get(features[0], set())
+        return {
+            "exact": [self.docs[doc_id] for doc_id in sorted(exact)],
+            "near": [(self.docs[doc_id], score) for doc_id, score in self._near(features, exact)],
+        }
+
+    def find_duplicates(self):
+        """Group every indexed book with its exact and near duplicates.
+
+        Only books that share an exact key or an LSH bucket are compared,
+        so the pass is close to linear in the library size.
+        """
+        parent = {}
+
+        def find(doc_id):
+            root = doc_id
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while parent.get(doc_id, doc_id) != root:
+                parent[doc_id], doc_id = root, parent[doc_id]
+            return root
+
+        def union(a, b):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        for docs in self.exact.values():
+            if len(docs) > 1:
+                first, *rest = sorted(docs)
+                for doc_id in rest:
+                    union(first, doc_id)
+        for doc_id, features in self._features.items():
+            # Each pair is only compared once, from its lower doc id
+            for other_id, _ in self._near(features, after=doc_id):
+                union(doc_id, other_id)
+
+        groups = {}
+        for doc_id in set(parent) | set(parent.values()):
+            groups.setdefault(find(doc_id), set()).add(doc_id)
+        return [[self.docs[doc_id] for doc_id in sorted(group)]
+                for _, group in sorted(groups.items()) if len(group) > 1]
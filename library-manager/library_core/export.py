@@ -0,0 +1,149 @@
+"""Streaming export of the library to CSV, JSON Lines or Parquet.
+
+Books are written a chunk at a time, so exporting never holds more than one
+chunk of encoded rows next to the library itself:
+
+    python -m library_core.export library.csv
+    python -m library_core.export library.parquet --backend sqlite --chunk-size 50000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+
+from .fields import to_year
+
+EXPORT_CHUNK = 10000
+EXPORT_FIELDS = ("title", "author", "publication_year", "genre", "read_status", "added_date")
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "jsonl": ("application/x-ndjson", ".jsonl"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+PARQUET_COMPRESSION = "zstd"
+
+
+def chunked(books, chunk_size=EXPORT_CHUNK):
+    """Split an in-memory list of books into the chunks the writers expect."""
+    for start in range(0, len(books), chunk_size):
+        yield books[start:start + chunk_size]
+
+
+def export_row(book):
+    return {
+        "title": book.get("title"),
+        "author": book.get("author"),
+        "publication_year": to_year(book.get("publication_year")),
+        "genre": book.get("genre"),
+        "read_status": bool(book.get("read_status")),
+        "added_date": book.get("added_date"),
+    }
+
+
+# Encoders: each turns chunks of books into chunks of bytes
+def iter_csv(chunks):
+    # Same columns bulk_import reads, so an export can be imported again
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for books in chunks:
+        writer.writerows(export_row(book) for book in books)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_jsonl(chunks):
+    for books in chunks:
+        yield "".join(json.dumps(export_row(book)) + "\n" for book in books).encode("utf-8")
+
+
+def write_parquet(chunks, binary_file):
+    """Write one compressed row group per chunk. Needs pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("title", pa.string()),
+        ("author", pa.string()),
+        ("publication_year", pa.int64()),
+        ("genre", pa.string()),
+        ("read_status", pa.bool_()),
+        ("added_date", pa.string()),
+    ])
+    # Dictionary encoding keeps repeated authors and genres small
+    with pq.ParquetWriter(binary_file, schema, compression=PARQUET_COMPRESSION,
+                          use_dictionary=["author", "genre", "added_date"]) as writer:
+        for books in chunks:
+            rows = [export_row(book) for book in books]
+            columns = {field: [row[field] for row in rows] for field in EXPORT_FIELDS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+
+def write_export(chunks, fmt, binary_file):
+    """Stream chunks of books into binary_file as fmt ("csv", "jsonl" or "parquet")."""
+    if fmt == "parquet":
+        write_parquet(chunks, binary_file)
+    elif fmt == "csv":
+        for data in iter_csv(chunks):
+            binary_file.write(data)
+    elif fmt == "jsonl":
+        for data in iter_jsonl(chunks):
+            binary_file.write(data)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+
+def detect_export_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    for fmt, (_, fmt_extension) in EXPORT_FORMATS.items():
+        if extension == fmt_extension:
+            return fmt
+    if extension == ".ndjson":
+        return "jsonl"
+    return None
+
+
+def main():
+    from .storage import get_storage
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="file to write")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), help="defaults to the output file's extension")
+    parser.add_argument("--backend", choices=["sqlite", "json", "journal"], help="library storage to read")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_export_format(args.output)
+    if fmt is None:
+        parser.error("cannot tell the format from the file name, pass --format")
+    storage = get_storage(args.backend)
+    exported = 0
+
+    def counted(chunks):
+        nonlocal exported
+        for books in chunks:
+            exported += len(books)
+            yield books
+
+    try:
+        # Written next to the target and renamed, so a failed export leaves no partial file
+        tmp_path = args.output + ".tmp"
+        try:
+            with open(tmp_path, "wb") as file:
+                write_export(counted(storage.iter_books(args.chunk_size)), fmt, file)
+            os.replace(tmp_path, args.output)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    finally:
+        storage.close()
+    print(f"Exported {exported} books to {args.output} ({fmt})")
+
+
+if __name__ == "__main__":
+    main()
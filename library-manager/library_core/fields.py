@@ -0,0 +1,12 @@
+# Publication years a book may have; wide enough for ancient texts, small
+# enough for every backend and export column
+YEAR_MIN = -9999
+YEAR_MAX = 9999
+
+
+def to_year(value):
+    """A book's publication_year as an int, or None if it is missing or not a number."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,118 @@
+from .fields import to_year
+
+COLUMNS = ["title", "author", "genre", "publication_year", "read_status"]
+CATEGORY_COLUMNS = ["author", "genre"]
+
+
+class LibraryFrame:
+    """Columnar (pandas) mirror of the library for charts and group-by analytics.
+
+    Adds and removes are buffered and folded into the DataFrame the next time
+    it is read, so mutations stay O(1) and the frame is rebuilt at most once
+    per batch of changes. pandas is only imported the first time the frame is
+    read, so sessions that never open a chart never pay for it.
+    """
+
+    def __init__(self, books=()):
+        self._frame = None      # built on first read
+        self._pending = []     # (row label, row values) not yet in the frame
+        self._removed = set()  # row labels to drop from the frame
+        self._labels = {}      # id(book) -> row label
+        self._next_label = 0
+        self.extend(books)
+
+    def _empty(self):
+        import pandas as pd
+
+        frame = pd.DataFrame({
+            "title": pd.Series(dtype="object"),
+            "author": pd.Series(dtype="category"),
+            "genre": pd.Series(dtype="category"),
+            "publication_year": pd.Series(dtype="Int64"),
+            "read_status": pd.Series(dtype="bool"),
+        })
+        return frame
+
+    def __len__(self):
+        return len(self._labels)
+
+    def add(self, book):
+        label = self._next_label
+        self._next_label += 1
+        self._labels[id(book)] = label
+        self._pending.append((label, (
+            str(book["title"]),
+            str(book["author"]),
+            str(book.get("genre")),
+            to_year(book.get("publication_year")),
+            bool(book.get("read_status")),
+        )))
+
+    def extend(self, books):
+        for book in books:
+            self.add(book)
+
+    def remove(self, book):
+        label = self._labels.pop(id(book), None)
+        if label is not None:
+            self._removed.add(label)
+
+    def update(self, old_book, new_book):
+        self.remove(old_book)
+        self.add(new_book)
+
+    @property
+    def frame(self):
+        import pandas as pd
+
+        frame = self._frame if self._frame is not None else self._empty()
+        if self._removed:
+            pending_labels = {label for label, _ in self._pending}
+            self._pending = [(label, row) for label, row in self._pending if label not in self._removed]
+            frame = frame.drop(index=[label for label in self._removed if label not in pending_labels],
+                               errors="ignore")
+            self._removed.clear()
+        if self._pending:
+            labels = [label for label, _ in self._pending]
+            new = pd.DataFrame([row for _, row in self._pending], columns=COLUMNS, index=labels)
+            new["publication_year"] = new["publication_year"].astype("Int64")
+            new["read_status"] = new["read_status"].astype("bool")
+            frame = pd.concat([frame, new]) if len(frame) else new
+            self._pending = []
+        for column in CATEGORY_COLUMNS:
+            if frame[column].dtype != "category":
+                frame[column] = frame[column].astype("category")
+        self._frame = frame
+        return frame
+
+    # Vectorized aggregations
+    def genre_counts(self):
+        counts = self.frame["genre"].value_counts(sort=True)
+        return counts[counts > 0]
+
+    def author_counts(self, top=None):
+        counts = self.frame["author"].value_counts(sort=True)
+        counts = counts[counts > 0]
+        return counts.head(top) if top else counts
+
+    def decade_counts(self):
+        years = self.frame["publication_year"].dropna()
+        return ((years // 10) * 10).value_counts().sort_index()
+
+    def read_rate_by_genre(self):
+        rates = self.frame.groupby("genre", observed=True)["read_status"].mean() * 100
+        return rates.sort_values(ascending=False)
+
+    def stats(self):
+        """Same shape as LibraryStats.as_dict(), computed from the columns."""
+        frame = self.frame
+        total_books = len(frame)
+        read_books = int(frame["read_status"].sum())
+        return {
+            'total_books': total_books,
+            'read_books': read_books,
+            'percent_read': (read_books / total_books) * 100 if total_books > 0 else 0,
+            'genres': self.genre_counts().to_dict(),
+            'authors': self.author_counts().to_dict(),
+            'decades': {int(decade): int(count) for decade, count in self.decade_counts().items()},
+        }
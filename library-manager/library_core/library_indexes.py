@@ -0,0 +1,205 @@
+import itertools
+
+from .library_frame import LibraryFrame
+from .query_engine import QueryIndex
+from .search_index import SearchIndex
+
+
+class LibraryIndexes:
+    """Every index derived from the library, built once per process.
+
+    The store keeps one of these and brings it up to date from its change
+    log before each read, so `version` is the store version the indexes
+    reflect. The duplicate and similarity indexes (numpy, scipy) are built
+    the first time a session asks for them.
+    """
+
+    def __init__(self):
+        self.books = {}  # book id -> book, as indexed
+        self.version = 0
+        self._build(())
+
+    def _build(self, books):
+        self.books = {book["id"]: book for book in books}
+        self.search = SearchIndex(self.books.values())
+        self.query = QueryIndex(self.books.values())
+        self.frame = LibraryFrame(self.books.values())
+        self._duplicates = None
+        self._similarity = None
+        self._sorted = {}
+
+    # Changes
+    def _add(self, books):
+        for book in books:
+            self.books[book["id"]] = book
+            self.search.add(book)
+            self.query.add(book)
+        self.frame.extend(books)
+        if self._duplicates is not None:
+            self._duplicates.extend(books)
+        if self._similarity is not None:
+            self._similarity.extend(books)
+
+    def _remove(self, book):
+        del self.books[book["id"]]
+        for index in (self.search, self.query, self.frame, self._duplicates, self._similarity):
+            if index is not None:
+                index.remove(book)
+
+    def _update(self, old_book, new_book):
+        self.books[new_book["id"]] = new_book  # keeps its place in insertion order
+        for index in (self.search, self.query, self.frame, self._duplicates, self._similarity):
+            if index is not None:
+                index.update(old_book, new_book)
+
+    def apply(self, changes, version):
+        """Replay [(op, old, new)] from the store's change log."""
+        added = []
+        for op, old, new in changes:
+            if op == "add":
+                # Runs of additions (e.g. an import batch) are indexed together
+                added.append(new)
+                continue
+            self._add(added)
+            added = []
+            if op == "update":
+                self._update(old, new)
+            else:
+                self._remove(old)
+        self._add(added)
+        self._sorted.clear()
+        self.version = version
+
+    def replace(self, books, version):
+        """Catch up with a reloaded library by diffing it against the indexed one.
+
+        Books are matched by id and must be the very dicts indexed before if
+        they did not change (LibraryStore.load() keeps them), so only books
+        that were added, removed or edited elsewhere are re-indexed.
+        """
+        books = list(books)
+        if not self.books:
+            self._build(books)
+        else:
+            current = {book["id"] for book in books}
+            changes = [("remove", book, None) for book_id, book in self.books.items() if book_id not in current]
+            for book in books:
+                old = self.books.get(book["id"])
+                if old is None:
+                    changes.append(("add", None, book))
+                elif old is not book:
+                    changes.append(("update", old, book))
+            self.apply(changes, version)
+        self.version = version
+
+    # Built on first use
+    def duplicates(self):
+        if self._duplicates is None:
+            from .dedup import DuplicateIndex
+            self._duplicates = DuplicateIndex(self.books.values())
+        return self._duplicates
+
+    def similarity(self):
+        if self._similarity is None:
+            from .recommend import SimilarityIndex
+            self._similarity = SimilarityIndex(list(self.books.values()))
+        return self._similarity
+
+    def sorted_books(self, name, key, descending):
+        # The sorted order is shared by every session until the library changes
+        cache_key = (name, descending)
+        books = self._sorted.get(cache_key)
+        if books is None:
+            books = self._sorted[cache_key] = sorted(self.books.values(), key=key, reverse=descending)
+        return books
+
+
+class LibraryView:
+    """Read-only access to the shared library and its indexes for one session.
+
+    Every call brings the indexes up to date and reads them under the store
+    lock, so sessions never see an index half way through a change. Books
+    are the store's own dicts and must not be modified.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    def _indexes(self):
+        return self._store.current_indexes()
+
+    @property
+    def version(self):
+        return self._store.version
+
+    def __len__(self):
+        return len(self._store.books)
+
+    def __contains__(self, book_id):
+        return book_id in self._store.books
+
+    def get(self, book_id):
+        return self._store.get(book_id)
+
+    def books(self):
+        with self._store.lock:
+            return list(self._indexes().books.values())
+
+    def page(self, offset, limit, descending=False):
+        """Books in insertion order (newest first if descending), no sort needed."""
+        with self._store.lock:
+            books = self._indexes().books.values()
+            books = reversed(books) if descending else books
+            return list(itertools.islice(books, offset, offset + limit))
+
+    def sorted_page(self, name, key, descending, offset, limit):
+        with self._store.lock:
+            return self._indexes().sorted_books(name, key, descending)[offset:offset + limit]
+
+    def stats(self):
+        """LibraryStats.as_dict() of the library, with its own copies of the counters."""
+        with self._store.lock:
+            stats = self._store.stats.as_dict()
+            for name in ("genres", "authors", "decades"):
+                stats[name] = dict(stats[name])
+            return stats
+
+    # Indexes
+    def search(self, query, fields, limit=None):
+        with self._store.lock:
+            return self._indexes().search.search(query, fields=fields, limit=limit)
+
+    def query(self, **filters):
+        with self._store.lock:
+            return self._indexes().query.query(**filters)
+
+    def genres(self):
+        with self._store.lock:
+            return self._indexes().query.genres()
+
+    def year_bounds(self):
+        with self._store.lock:
+            return self._indexes().query.year_bounds()
+
+    def chart_counts(self, top_authors=None):
+        """The frame's aggregations for the charts, as pandas Series."""
+        with self._store.lock:
+            frame = self._indexes().frame
+            return {
+                'genres': frame.genre_counts(),
+                'decades': frame.decade_counts(),
+                'authors': frame.author_counts(top=top_authors),
+                'read_rates': frame.read_rate_by_genre(),
+            }
+
+    def check_duplicates(self, book):
+        with self._store.lock:
+            return self._indexes().duplicates().check(book)
+
+    def find_duplicates(self):
+        with self._store.lock:
+            return self._indexes().duplicates().find_duplicates()
+
+    def similar(self, book, k=5):
+        with self._store.lock:
+            return self._indexes().similarity().similar(book, k)
@@ -0,0 +1,120 @@
+import json
+
+from .fields import to_year
+
+
+def book_decade(book):
+    year = to_year(book.get("publication_year"))
+    return None if year is None else (year // 10) * 10
+
+
+def stat_key(value):
+    # A missing genre or author counts under "", as in the SQLite stats table
+    return "" if value is None else str(value)
+
+
+def stat_deltas(book, sign=1):
+    """Counter changes caused by adding (sign=1) or removing (sign=-1) one book."""
+    deltas = [("total", "", sign), ("genre", stat_key(book.get("genre")), sign),
+              ("author", stat_key(book.get("author")), sign)]
+    if book.get("read_status"):
+        deltas.append(("read", "", sign))
+    decade = book_decade(book)
+    if decade is not None:
+        deltas.append(("decade", decade, sign))
+    return deltas
+
+
+class LibraryStats:
+    """Running totals for the Library Statistics page, updated in O(1) per change."""
+
+    def __init__(self):
+        self.total_books = 0
+        self.read_books = 0
+        self.genres = {}
+        self.authors = {}
+        self.decades = {}
+
+    @classmethod
+    def from_books(cls, books):
+        stats = cls()
+        for book in books:
+            stats.add(book)
+        return stats
+
+    def copy(self):
+        stats = LibraryStats()
+        stats.total_books = self.total_books
+        stats.read_books = self.read_books
+        stats.genres = dict(self.genres)
+        stats.authors = dict(self.authors)
+        stats.decades = dict(self.decades)
+        return stats
+
+    def _bump(self, counts, key, delta):
+        count = counts.get(key, 0) + delta
+        if count > 0:
+            counts[key] = count
+        else:
+            counts.pop(key, None)
+
+    def apply(self, deltas):
+        for kind, key, delta in deltas:
+            if kind == "total":
+                self.total_books += delta
+            elif kind == "read":
+                self.read_books += delta
+            elif kind == "genre":
+                self._bump(self.genres, key, delta)
+            elif kind == "author":
+                self._bump(self.authors, key, delta)
+            elif kind == "decade":
+                self._bump(self.decades, key, delta)
+
+    def add(self, book):
+        self.apply(stat_deltas(book, 1))
+
+    def remove(self, book):
+        self.apply(stat_deltas(book, -1))
+
+    def replace(self, old_book, new_book):
+        """Account for an edited book; old_book is a copy taken before the edit."""
+        self.remove(old_book)
+        self.add(new_book)
+
+    def as_dict(self):
+        # Same shape get_library_stats() always returned; the dicts are live, not copies
+        return {
+            'total_books': self.total_books,
+            'read_books': self.read_books,
+            'percent_read': (self.read_books / self.total_books) * 100 if self.total_books > 0 else 0,
+            'genres': self.genres,
+            'authors': self.authors,
+            'decades': self.decades
+        }
+
+    def to_dict(self):
+        return {
+            "total_books": self.total_books,
+            "read_books": self.read_books,
+            "genres": self.genres,
+            "authors": self.authors,
+            "decades": {str(decade): count for decade, count in self.decades.items()},
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.total_books = data["total_books"]
+        stats.read_books = data["read_books"]
+        stats.genres = data["genres"]
+        stats.authors = data["authors"]
+        stats.decades = {int(decade): count for decade, count in data["decades"].items()}
+        return stats
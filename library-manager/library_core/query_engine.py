@@ -0,0 +1,191 @@
+import bisect
+import heapq
+
+from .fields import to_year
+
+# Sort options for query(): book -> sort key
+SORT_KEYS = {
+    "added": None,  # insertion order
+    "title": lambda book: str(book["title"]).lower(),
+    "author": lambda book: str(book["author"]).lower(),
+    "year": None,   # served from the year index
+}
+
+
+def _author_key(author):
+    return " ".join(str(author).lower().split())
+
+
+class QueryIndex:
+    """Secondary indexes over the library for compound filtered queries.
+
+    - a sorted (year, doc id) list for year range scans
+    - doc id sets per genre, per author and per read status
+    Filters are answered by intersecting the smallest candidate sets first,
+    so a selective filter never scans the whole library.
+    """
+
+    def __init__(self, books=()):
+        self.docs = {}      # doc id -> book
+        self._doc_ids = {}  # id(book) -> doc id
+        self._indexed = {}  # doc id -> (year, genre, author key, read) that were indexed
+        self._next_id = 0
+        self.years = []     # sorted (year, doc id)
+        self.no_year = set()
+        self.by_genre = {}
+        self.by_author = {}
+        self.by_read = {True: set(), False: set()}
+        for book in books:
+            self._index(book, sort_years=False)
+        self.years.sort()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _index(self, book, sort_years=True, doc_id=None):
+        if doc_id is None:
+            doc_id = self._next_id
+            self._next_id += 1
+        year = to_year(book.get("publication_year"))
+        genre = book.get("genre")
+        author = _author_key(book.get("author", ""))
+        read = bool(book.get("read_status"))
+        if year is None:
+            self.no_year.add(doc_id)
+        elif sort_years:
+            bisect.insort(self.years, (year, doc_id))
+        else:
+            self.years.append((year, doc_id))
+        self.by_genre.setdefault(genre, set()).add(doc_id)
+        self.by_author.setdefault(author, set()).add(doc_id)
+        self.by_read[read].add(doc_id)
+        self.docs[doc_id] = book
+        self._doc_ids[id(book)] = doc_id
+        self._indexed[doc_id] = (year, genre, author, read)
+        return doc_id
+
+    def add(self, book):
+        return self._index(book)
+
+    def remove(self, book):
+        doc_id = self._doc_ids.pop(id(book), None)
+        if doc_id is None:
+            return
+        self._unindex(doc_id)
+        del self.docs[doc_id]
+
+    def _unindex(self, doc_id):
+        year, genre, author, read = self._indexed.pop(doc_id)
+        if year is None:
+            self.no_year.discard(doc_id)
+        else:
+            position = bisect.bisect_left(self.years, (year, doc_id))
+            del self.years[position]
+        for index, key in ((self.by_genre, genre), (self.by_author, author)):
+            docs = index[key]
+            docs.discard(doc_id)
+            if not docs:
+                del index[key]
+        self.by_read[read].discard(doc_id)
+
+    def update(self, old_book, new_book):
+        """Index new_book in place of old_book (books are replaced, never edited).
+
+        The doc id is kept, so the book keeps its place in insertion order.
+        """
+        doc_id = self._doc_ids.pop(id(old_book), None)
+        if doc_id is None:
+            self.add(new_book)
+            return
+        self._unindex(doc_id)
+        self._index(new_book, doc_id=doc_id)
+
+    def genres(self):
+        return sorted(genre for genre in self.by_genre if genre is not None)
+
+    def year_bounds(self):
+        if not self.years:
+            return None
+        return self.years[0][0], self.years[-1][0]
+
+    def _year_range(self, year_min, year_max):
+        """Doc ids with year_min <= year <= year_max, in year order."""
+        lo = 0 if year_min is None else bisect.bisect_left(self.years, (year_min, -1))
+        hi = len(self.years) if year_max is None else bisect.bisect_left(self.years, (year_max + 1, -1))
+        return lo, hi
+
+    def query(self, author=None, genre=None, year_min=None, year_max=None, read_status=None,
+              sort_by="added", descending=False, limit=None, offset=0):
+        """Return (total matches, books for [offset, offset + limit)) for a compound filter.
+
+        genre may be a single genre or a list of genres (any of them matches).
+        """
+        candidate_sets = []
+        if author:
+            candidate_sets.append(self.by_author.get(_author_key(author), set()))
+        if genre:
+            genres = [genre] if isinstance(genre, str) else list(genre)
+            if len(genres) == 1:
+                candidate_sets.append(self.by_genre.get(genres[0], set()))
+            else:
+                candidate_sets.append(set().union(*(self.by_genre.get(g, ()) for g in genres)))
+        if read_status is not None:
+            candidate_sets.append(self.by_read[bool(read_status)])
+        candidate_sets.sort(key=len)
+
+        has_year_filter = year_min is not None or year_max is not None
+        lo, hi = self._year_range(year_min, year_max) if has_year_filter else (0, len(self.years))
+        range_size = hi - lo
+
+        # Pick the cheapest way in: a year range scan or the smallest set
+        ordered_by_year = False
+        ordered_by_id = False
+        if has_year_filter and (not candidate_sets or range_size <= len(candidate_sets[0])):
+            others = candidate_sets
+            matches = [doc_id for _, doc_id in self.years[lo:hi]
+                       if all(doc_id in docs for docs in others)]
+            ordered_by_year = True
+        elif candidate_sets:
+            smallest, others = candidate_sets[0], candidate_sets[1:]
+            matches = [doc_id for doc_id in smallest if all(doc_id in docs for docs in others)]
+            if has_year_filter:
+                matches = [doc_id for doc_id in matches if self._in_years(doc_id, year_min, year_max)]
+        elif sort_by == "year":
+            matches = [doc_id for _, doc_id in self.years] + sorted(self.no_year)
+            ordered_by_year = True
+        else:
+            matches = list(self.docs)  # dicts keep insertion order
+            ordered_by_id = True
+
+        total = len(matches)
+        matches = self._sort(matches, sort_by, descending, ordered_by_year, ordered_by_id, limit, offset)
+        end = None if limit is None else offset + limit
+        return total, [self.docs[doc_id] for doc_id in matches[offset:end]]
+
+    def _in_years(self, doc_id, year_min, year_max):
+        year = self._indexed[doc_id][0]
+        if year is None:
+            return False
+        return (year_min is None or year >= year_min) and (year_max is None or year <= year_max)
+
+    def _sort(self, matches, sort_by, descending, ordered_by_year, ordered_by_id, limit, offset):
+        if sort_by == "year":
+            if not ordered_by_year:
+                key = lambda doc_id: (self._indexed[doc_id][0] is None, self._indexed[doc_id][0] or 0, doc_id)
+                matches = sorted(matches, key=key)
+            return matches[::-1] if descending else matches
+        if sort_by == "added":
+            # Doc ids are handed out in insertion order
+            if not ordered_by_id:
+                if limit is not None and offset + limit < len(matches):
+                    pick = heapq.nlargest if descending else heapq.nsmallest
+                    return pick(offset + limit, matches)
+                matches = sorted(matches)
+            return matches[::-1] if descending else matches
+        book_key = SORT_KEYS[sort_by]
+        key = lambda doc_id: book_key(self.docs[doc_id])
+        if limit is not None and offset + limit < len(matches):
+            # Only the requested window needs to be ordered
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            return pick(offset + limit, matches, key=key)
+        return sorted(matches, key=key, reverse=descending)
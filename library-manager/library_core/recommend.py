@@ -0,0 +1,177 @@
+import math
+import zlib
+
+from .dedup import normalize_author, normalize_tokens
+
+# Hashed feature space: collisions are rare at this size and the matrix
+# never needs a vocabulary
+N_FEATURES = 1 << 18
+# How much a shared feature from each field counts
+FIELD_WEIGHTS = {"title": 1.0, "author": 1.5, "author_token": 0.5, "genre": 0.5}
+STOP_WORDS = {"the", "a", "an", "of", "and", "in", "on", "to", "for", "with", "at", "by", "from"}
+COMPACT_MIN_DEAD = 1000  # rebuild once this many removed rows (and most rows) are dead
+
+
+def book_features(book, n_features=N_FEATURES):
+    """Hashed feature -> weight (term frequency x field weight) for a book."""
+    features = {}
+
+    def add(feature, weight):
+        index = zlib.crc32(feature.encode()) & (n_features - 1)
+        features[index] = features.get(index, 0.0) + weight
+
+    for token in normalize_tokens(book.get("title", "")):
+        if token not in STOP_WORDS:
+            add("t:" + token, FIELD_WEIGHTS["title"])
+    author = normalize_author(book.get("author", ""))
+    if author:
+        add("a:" + author, FIELD_WEIGHTS["author"])
+        for token in author.split():
+            add("at:" + token, FIELD_WEIGHTS["author_token"])
+    genre = str(book.get("genre") or "").strip().lower()
+    if genre:
+        add("g:" + genre, FIELD_WEIGHTS["genre"])
+    return features
+
+
+def _book_key(book):
+    return book["id"] if book.get("id") is not None else ("object", id(book))
+
+
+class SimilarityIndex:
+    """TF-IDF vectors of every book in a sparse matrix, for "similar books".
+
+    Rows hold hashed term frequencies; IDF weights come from document
+    frequencies kept up to date on every add and remove, so the matrix never
+    has to be rebuilt when the vocabulary shifts. New books are buffered and
+    appended to the CSR matrix in one go on the next query; removed rows are
+    masked out and dropped by an occasional compaction. A query is one
+    sparse matrix-vector product plus a partial sort, so it stays in the
+    low milliseconds for 100k books. numpy and scipy load on first use.
+    """
+
+    def __init__(self, books=(), n_features=N_FEATURES):
+        import numpy as np
+        from scipy import sparse
+
+        self._np = np
+        self._sparse = sparse
+        self.n_features = n_features
+        self.books = []      # row -> book, None once removed
+        self.rows = {}       # book key -> row
+        self.df = np.zeros(n_features, dtype=np.int32)  # books containing each feature
+        self.live = 0
+        self._matrix = sparse.csr_matrix((0, n_features), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._pending = []   # (indices, weights) of rows not yet in the matrix
+        self._norms = None   # cached TF-IDF row norms, dropped on every change
+        self.extend(books)
+
+    def __len__(self):
+        return self.live
+
+    # Changes
+    def add(self, book):
+        self.extend([book])
+
+    def extend(self, books):
+        np = self._np
+        for book in books:
+            features = book_features(book, self.n_features)
+            indices = np.fromiter(features.keys(), dtype=np.int32, count=len(features))
+            weights = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+            self.rows[_book_key(book)] = len(self.books)
+            self.books.append(book)
+            self._pending.append((indices, weights))
+            self.df[indices] += 1
+            self.live += 1
+        self._norms = None
+
+    def remove(self, book):
+        row = self.rows.pop(_book_key(book), None)
+        if row is None:
+            return
+        self._flush()
+        indices, _ = self._row(row)
+        self.df[indices] -= 1
+        self._alive[row] = False
+        self.books[row] = None
+        self.live -= 1
+        self._norms = None
+        dead = len(self.books) - self.live
+        if dead >= COMPACT_MIN_DEAD and dead > self.live:
+            self._compact()
+
+    def update(self, old_book, new_book):
+        self.remove(old_book)
+        self.add(new_book)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        np = self._np
+        lengths = [len(indices) for indices, _ in self._pending]
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        new_rows = self._sparse.csr_matrix(
+            (np.concatenate([weights for _, weights in self._pending]),
+             np.concatenate([indices for indices, _ in self._pending]),
+             indptr),
+            shape=(len(lengths), self.n_features),
+        )
+        self._matrix = self._sparse.vstack([self._matrix, new_rows], format="csr")
+        self._alive = np.concatenate([self._alive, np.ones(len(lengths), dtype=bool)])
+        self._pending = []
+
+    def _compact(self):
+        books = [book for book in self.books if book is not None]
+        self.__init__(books, self.n_features)
+
+    def _row(self, row):
+        start, end = self._matrix.indptr[row], self._matrix.indptr[row + 1]
+        return self._matrix.indices[start:end], self._matrix.data[start:end]
+
+    # Queries
+    def _idf(self):
+        # Smoothed IDF, as in scikit-learn: rarer features count for more
+        np = self._np
+        return (np.log((1.0 + self.live) / (1.0 + self.df)) + 1.0).astype(np.float32)
+
+    def _row_norms(self, idf):
+        if self._norms is None:
+            squared = self._matrix.copy()
+            squared.data **= 2
+            self._norms = self._np.sqrt(squared @ (idf * idf))
+        return self._norms
+
+    def similar(self, book, k=5):
+        """[(book, cosine similarity)] of the k books most similar to book, best first."""
+        np = self._np
+        self._flush()
+        if not self.live:
+            return []
+        row = self.rows.get(_book_key(book))
+        if row is not None:
+            indices, weights = self._row(row)
+        else:
+            features = book_features(book, self.n_features)
+            indices = np.fromiter(features.keys(), dtype=np.int32, count=len(features))
+            weights = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+        if not len(indices):
+            return []
+        idf = self._idf()
+        query = np.zeros(self.n_features, dtype=np.float32)
+        query[indices] = weights * idf[indices] * idf[indices]
+        query_norm = math.sqrt(float(np.sum((weights * idf[indices]) ** 2)))
+        norms = self._row_norms(idf)
+        scores = self._matrix @ query
+        np.divide(scores, norms * query_norm, out=scores, where=norms > 0)
+        scores[~self._alive] = 0.0
+        if row is not None:
+            scores[row] = 0.0
+        k = min(k, int(np.count_nonzero(scores > 0)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.books[i], float(scores[i])) for i in top]
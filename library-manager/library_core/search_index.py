@@ -0,0 +1,204 @@
+import bisect
+import heapq
+import re
+
+# Fields that can be searched and how much a hit in each one is worth
+SEARCH_FIELDS = ("title", "author", "genre")
+FIELD_WEIGHTS = {"title": 3.0, "author": 2.0, "genre": 1.0}
+
+# Match quality weights
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.7
+FUZZY_SCORE = 0.5
+
+MIN_PREFIX_LENGTH = 2      # shorter query tokens only match exactly
+MAX_PREFIX_EXPANSIONS = 64  # cap on vocabulary tokens one prefix may expand to
+FUZZY_THRESHOLD = 0.3      # minimum trigram similarity for a typo match
+MAX_FUZZY_EXPANSIONS = 16
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FieldIndex:
+    """Inverted index (token -> doc ids) for one field, plus a trigram index over its vocabulary."""
+
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []  # sorted, for prefix lookups
+        self.grams = {}       # trigram -> set of tokens
+
+    def add(self, doc_id, tokens):
+        for token in tokens:
+            docs = self.postings.get(token)
+            if docs is None:
+                docs = self.postings[token] = set()
+                bisect.insort(self.vocabulary, token)
+                for gram in trigrams(token):
+                    self.grams.setdefault(gram, set()).add(token)
+            docs.add(doc_id)
+
+    def remove(self, doc_id, tokens):
+        for token in tokens:
+            docs = self.postings.get(token)
+            if docs is None:
+                continue
+            docs.discard(doc_id)
+            if not docs:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+                for gram in trigrams(token):
+                    tokens_for_gram = self.grams.get(gram)
+                    if tokens_for_gram is not None:
+                        tokens_for_gram.discard(token)
+                        if not tokens_for_gram:
+                            del self.grams[gram]
+
+    def expand(self, query_token):
+        """Return [(vocabulary token, match score)] for a query token: exact, prefix, then fuzzy."""
+        matches = []
+        if query_token in self.postings:
+            matches.append((query_token, EXACT_SCORE))
+        if len(query_token) >= MIN_PREFIX_LENGTH:
+            start = bisect.bisect_left(self.vocabulary, query_token)
+            for token in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+                if not token.startswith(query_token):
+                    break
+                if token != query_token:
+                    matches.append((token, PREFIX_SCORE))
+        if not matches and len(query_token) >= 3:
+            matches = self._fuzzy(query_token)
+        return matches
+
+    def _fuzzy(self, query_token):
+        query_grams = trigrams(query_token)
+        shared = {}
+        for gram in query_grams:
+            for token in self.grams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        scored = []
+        for token, common in shared.items():
+            similarity = common / (len(query_grams) + len(token) + 1 - common)
+            if similarity >= FUZZY_THRESHOLD:
+                scored.append((similarity, token))
+        best = heapq.nlargest(MAX_FUZZY_EXPANSIONS, scored)
+        return [(token, FUZZY_SCORE * similarity) for similarity, token in best]
+
+
+class SearchIndex:
+    """Incrementally maintained search index over the library."""
+
+    def __init__(self, books=()):
+        self.fields = {field: FieldIndex() for field in SEARCH_FIELDS}
+        self.docs = {}     # doc id -> book
+        self._doc_ids = {}  # id(book) -> doc id
+        self._indexed = {}  # doc id -> field tokens that were indexed
+        self._next_id = 0
+        for book in books:
+            self.add(book)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, book, doc_id=None):
+        if doc_id is None:
+            doc_id = self._next_id
+            self._next_id += 1
+        tokens = {field: set(tokenize(book.get(field, ""))) for field in SEARCH_FIELDS}
+        for field, field_tokens in tokens.items():
+            self.fields[field].add(doc_id, field_tokens)
+        self.docs[doc_id] = book
+        self._doc_ids[id(book)] = doc_id
+        self._indexed[doc_id] = tokens
+        return doc_id
+
+    def remove(self, book):
+        doc_id = self._doc_ids.pop(id(book), None)
+        if doc_id is None:
+            return
+        for field, field_tokens in self._indexed.pop(doc_id).items():
+            self.fields[field].remove(doc_id, field_tokens)
+        del self.docs[doc_id]
+
+    def update(self, old_book, new_book):
+        """Index new_book in place of old_book (books are replaced, never edited).
+
+        The doc id is kept, so ties still rank in insertion order.
+        """
+        doc_id = self._doc_ids.get(id(old_book))
+        self.remove(old_book)
+        self.add(new_book, doc_id)
+
+    def search(self, query, fields=SEARCH_FIELDS, limit=None):
+        """Return books matching every token of query, best matches first."""
+        if isinstance(fields, str):
+            fields = (fields,)
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            books = list(self.docs.values())
+            return books[:limit] if limit else books
+
+        # For every query token: [(score, posting set)] ordered best match first
+        plans = []
+        for query_token in dict.fromkeys(query_tokens):
+            expansions = []
+            for field in fields:
+                field_index = self.fields[field]
+                for token, match_score in field_index.expand(query_token):
+                    expansions.append((FIELD_WEIGHTS[field] * match_score, field_index.postings[token]))
+            if not expansions:
+                return []
+            expansions.sort(key=lambda item: -item[0])
+            plans.append(expansions)
+
+        # Start from the most selective token, then only probe the others
+        plans.sort(key=lambda expansions: sum(len(postings) for _, postings in expansions))
+        if len(plans) == 1 and limit:
+            return [self.docs[doc_id] for doc_id in self._top_docs(plans[0], limit)]
+
+        scores = {}
+        for score, postings in plans[0]:
+            for doc_id in postings:
+                if doc_id not in scores:
+                    scores[doc_id] = score
+        for expansions in plans[1:]:
+            merged = {}
+            for doc_id, score in scores.items():
+                for token_score, postings in expansions:
+                    if doc_id in postings:
+                        merged[doc_id] = score + token_score
+                        break
+            scores = merged
+            if not scores:
+                return []
+
+        if limit:
+            ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        else:
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [self.docs[doc_id] for doc_id, _ in ranked]
+
+    def _top_docs(self, expansions, limit):
+        """Best `limit` doc ids for a single query token without scoring every match.
+
+        Docs that tie on score are taken in posting order, so a very common token
+        costs O(limit) instead of O(matches).
+        """
+        selected = []
+        seen = set()
+        for _, postings in expansions:
+            for doc_id in postings:
+                if doc_id not in seen:
+                    seen.add(doc_id)
+                    selected.append(doc_id)
+                    if len(selected) == limit:
+                        return selected
+        return selected
@@ -0,0 +1,242 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: locking stays within this process
+    fcntl = None
+
+from .library_indexes import LibraryIndexes, LibraryView
+from .storage import get_storage
+from .write_behind import WriteBehindQueue
+
+LIBRARY_LOCK = "library.lock"
+CHANGE_LOG_SIZE = 50000  # changes kept for sessions to catch up incrementally
+
+
+class ConflictError(Exception):
+    """A change was based on a version of the library that is no longer current."""
+
+
+class FileLock:
+    """Advisory lock on a file, shared by every process that uses the library.
+
+    Re-entrant within a process; threads of the same process queue on an
+    ordinary lock before taking the file lock.
+    """
+
+    def __init__(self, path=LIBRARY_LOCK):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            self.file = open(self.path, "a")
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+        self.thread_lock.release()
+
+
+_id_lock = threading.Lock()
+_last_id = 0
+
+
+def new_book_id():
+    """Increasing, practically unique id: microseconds since the epoch.
+
+    Needs no coordination between processes, keeps ids in insertion order and
+    stays well inside the integer range JSON and SQLite handle exactly.
+    """
+    global _last_id
+    with _id_lock:
+        _last_id = max(time.time_ns() // 1000, _last_id + 1)
+        return _last_id
+
+
+class LibraryStore:
+    """The library shared by every session of the app process.
+
+    Each committed change bumps `version` and is appended to a change log.
+    The search, query, frame, duplicate and similarity indexes are kept here
+    once for the whole process and replay that log before they are read;
+    sessions read them through view(). Writes reach storage through
+    one write-behind queue, under a file lock shared with other processes.
+    Edits are checked against the record the session last saw and merged
+    field by field; only edits to the same field of the same book conflict.
+    """
+
+    def __init__(self, storage, lock_path=LIBRARY_LOCK):
+        self.storage = storage
+        self.file_lock = FileLock(lock_path)
+        storage.file_lock = self.file_lock  # e.g. for background journal compaction
+        self.lock = threading.RLock()
+        self.books = {}     # book id -> book; dicts are never edited in place
+        self.stats = None
+        self.version = 0
+        self.changes = deque(maxlen=CHANGE_LOG_SIZE)  # (version, op, old book, new book)
+        self.reloaded_version = 0  # changes from before this are not in the log
+        self.stale = False         # another process wrote to storage
+        self.queue = WriteBehindQueue(storage, guard=self._write_guard)
+        self.indexes = LibraryIndexes()  # built on the first read
+        self.load()
+
+    @contextmanager
+    def _write_guard(self):
+        with self.file_lock:
+            if self.storage.changed_since_load():
+                self.stale = True
+            yield
+
+    # Loading
+    def load(self):
+        with self.lock, self.queue.exclusive() as storage, self.file_lock:
+            books = storage.load()
+            missing = [book for book in books if book.get("id") is None]
+            if missing:
+                # Legacy books without ids get them once, for every process
+                for book in missing:
+                    book["id"] = new_book_id()
+                storage.replace_all(books)
+            previous = self.books
+            for position, book in enumerate(books):
+                old = previous.get(book["id"])
+                if old == book:
+                    books[position] = old  # unchanged books stay the dicts already indexed
+            self.books = {book["id"]: book for book in books}
+            self.stats = storage.load_stats().copy()
+            self.version += 1
+            self.reloaded_version = self.version
+            self.changes.clear()
+            self.stale = False
+
+    def refresh(self):
+        """Reload if another process changed the stored library. Returns True if it did."""
+        with self.lock:
+            with self.queue.write_lock:
+                changed = self.stale or self.storage.changed_since_load()
+            if changed:
+                self.load()
+            return changed
+
+    def view(self):
+        """Read-only access to the library and its shared indexes."""
+        return LibraryView(self)
+
+    def current_indexes(self):
+        """The shared LibraryIndexes, brought up to this version. Hold self.lock."""
+        indexes = self.indexes
+        if indexes.version != self.version:
+            changes = self.changes_since(indexes.version)
+            if changes is None:
+                indexes.replace(self.books.values(), self.version)
+            else:
+                indexes.apply(changes, self.version)
+        return indexes
+
+    def changes_since(self, version):
+        """[(op, old, new)] committed after version, or None if that is older than the log."""
+        with self.lock:
+            if version < self.reloaded_version:
+                return None
+            if version == self.version:
+                return []
+            if not self.changes or self.changes[0][0] > version + 1:
+                return None  # older than the log reaches
+            return [(op, old, new) for change_version, op, old, new in self.changes
+                    if change_version > version]
+
+    def _log(self, op, old, new):
+        self.version += 1
+        self.changes.append((self.version, op, old, new))
+
+    def get(self, book_id):
+        return self.books.get(book_id)
+
+    # Changes
+    def insert(self, book):
+        self.insert_many([book])
+
+    def insert_many(self, books):
+        with self.lock:
+            for book in books:
+                if book.get("id") is None:
+                    book["id"] = new_book_id()
+                self.books[book["id"]] = book
+                self.stats.add(book)
+                self._log("add", None, book)
+                self.queue.insert(book)
+
+    def delete(self, book):
+        """Remove a book. Returns False if another session already removed it."""
+        with self.lock:
+            current = self.books.pop(book["id"], None)
+            if current is None:
+                return False
+            self.stats.remove(current)
+            self._log("remove", current, None)
+            self.queue.delete(current)
+            return True
+
+    def update(self, book, changes):
+        """Apply {field: value} changes to the book the caller last saw.
+
+        Fields other sessions changed meanwhile are kept; changing the same
+        field to a different value raises ConflictError.
+        """
+        with self.lock:
+            current = self.books.get(book["id"])
+            if current is None:
+                raise ConflictError(f"'{book['title']}' was removed by another session")
+            for field, value in changes.items():
+                theirs = current.get(field)
+                if theirs != book.get(field) and theirs != value:
+                    raise ConflictError(f"'{book['title']}' was changed by another session ({field})")
+            new = dict(current, **changes)
+            self.books[new["id"]] = new
+            self.stats.replace(current, new)
+            self._log("update", current, new)
+            # Storage applies only these fields, over whatever another process wrote
+            self.queue.update(new, base=current)
+            return new
+
+    def replace_all(self, books, expected_version):
+        """Overwrite the whole library, only if nothing changed since expected_version."""
+        with self.lock:
+            if expected_version != self.version:
+                raise ConflictError("the library was changed by another session")
+            with self.queue.exclusive() as storage, self.file_lock:
+                for book in books:
+                    if book.get("id") is None:
+                        book["id"] = new_book_id()
+                storage.replace_all(books)
+            self.load()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_shared_store(backend=None):
+    """The process-wide LibraryStore for a backend in the current directory."""
+    key = (backend, os.getcwd())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = LibraryStore(get_storage(backend))
+        return store
@@ -0,0 +1,792 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+
+from .fields import to_year
+from .library_stats import LibraryStats, stat_deltas
+
+# Storage files (relative to the app folder)
+LIBRARY_JSON = "library.json"
+LIBRARY_DB = "library.db"
+LIBRARY_STATS_JSON = "library_stats.json"
+LIBRARY_SNAPSHOT = "library.snapshot.json"
+LIBRARY_JOURNAL = "library.journal"
+
+# Bumped when the stats table's keys change, so older databases recount once
+STATS_FORMAT = "3"
+
+# Backend selection: "sqlite" (default), "journal" or "json"
+DEFAULT_BACKEND = os.environ.get("LIBRARY_BACKEND", "sqlite")
+
+BOOK_FIELDS = ("title", "author", "publication_year", "genre", "read_status", "added_date")
+
+
+def merge_update(stored, base, book):
+    """The fields book changed relative to base, applied on top of stored.
+
+    stored is what storage holds now. Fields another process changed since
+    base are kept unless book changed them too, in which case book wins.
+    """
+    if stored is None or base is None:
+        return book
+    merged = dict(stored)
+    for field in BOOK_FIELDS:
+        if book.get(field) != base.get(field):
+            merged[field] = book.get(field)
+    return merged
+
+
+# Base class for every storage backend
+class LibraryStorage:
+    # Lock shared by every process writing the library (LibraryStore sets it);
+    # taken by backends that write on threads of their own
+    file_lock = nullcontext()
+
+    def load(self):
+        """Return the whole library as a list of book dicts."""
+        raise NotImplementedError
+
+    def iter_books(self, chunk_size=5000):
+        """Yield the library in lists of up to chunk_size books."""
+        books = self.load()
+        for start in range(0, len(books), chunk_size):
+            yield books[start:start + chunk_size]
+
+    def insert(self, book):
+        """Persist one new book. May set book["id"]."""
+        raise NotImplementedError
+
+    def insert_many(self, books):
+        """Persist a batch of new books."""
+        for book in books:
+            self.insert(book)
+
+    def delete(self, book):
+        """Remove one book from storage."""
+        raise NotImplementedError
+
+    def update(self, book):
+        """Persist changes made to an existing book."""
+        raise NotImplementedError
+
+    def replace_all(self, books):
+        """Overwrite storage with the given list of books."""
+        raise NotImplementedError
+
+    def write_batch(self, inserts=(), updates=(), deletes=(), bases=None):
+        """Persist a batch of coalesced changes (used by the write-behind queue).
+
+        bases maps a book id to the book an update was made to; the update is
+        merged with the stored book (see merge_update) instead of replacing it.
+        """
+        if inserts:
+            self.insert_many(inserts)
+        for book in updates:
+            self.update(book)
+        for book in deletes:
+            self.delete(book)
+
+    def load_stats(self):
+        """Return the persisted LibraryStats for the stored books."""
+        return LibraryStats.from_books(self.load())
+
+    def changed_since_load(self):
+        """True if something other than this object changed the stored library."""
+        return False
+
+    def close(self):
+        pass
+
+
+def file_fingerprint(path):
+    """(mtime, size, inode) of path, or None if it does not exist."""
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return (info.st_mtime_ns, info.st_size, info.st_ino)
+
+
+# JSON file backend (original behaviour: every change rewrites the file)
+class JsonStorage(LibraryStorage):
+    def __init__(self, path=LIBRARY_JSON, stats_path=LIBRARY_STATS_JSON):
+        self.path = path
+        self.stats_path = stats_path
+        self.books = []
+        self.stats = None
+        self.fingerprint = None  # file_fingerprint() of the data we hold
+
+    def load(self):
+        # Reuse the parsed library unless the file was replaced or modified
+        fingerprint = file_fingerprint(self.path)
+        if self.stats is not None and fingerprint == self.fingerprint:
+            return list(self.books)
+        if fingerprint is not None:
+            with open(self.path, "r") as file:
+                self.books = json.load(file)
+        else:
+            self.books = []
+        self.fingerprint = fingerprint
+        self.stats = self._read_stats()
+        return list(self.books)
+
+    def changed_since_load(self):
+        return file_fingerprint(self.path) != self.fingerprint
+
+    def _read_stats(self):
+        # The sidecar is only trusted for the exact library.json it was saved with
+        try:
+            with open(self.stats_path, "r") as file:
+                data = json.load(file)
+            if self.fingerprint is not None and data["library_fingerprint"] == list(self.fingerprint):
+                return LibraryStats.from_dict(data["stats"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        # Missing or out of date (e.g. library.json edited by hand): rebuild once
+        return LibraryStats.from_books(self.books)
+
+    def _write(self):
+        with open(self.path, "w") as file:
+            json.dump(self.books, file)
+        self.fingerprint = file_fingerprint(self.path)
+        with open(self.stats_path, "w") as file:
+            json.dump({"library_fingerprint": list(self.fingerprint), "stats": self.stats.to_dict()}, file)
+
+    def _ensure_loaded(self):
+        if self.stats is None:
+            self.load()
+
+    def load_stats(self):
+        self._ensure_loaded()
+        return self.stats
+
+    def insert(self, book):
+        self._ensure_loaded()
+        self.books.append(book)
+        self.stats.add(book)
+        self._write()
+
+    def insert_many(self, books):
+        self._ensure_loaded()
+        self.books.extend(books)
+        for book in books:
+            self.stats.add(book)
+        self._write()
+
+    def _position(self, book):
+        for i, stored in enumerate(self.books):
+            if stored is book:
+                return i
+        # A different copy of the same book, e.g. after the file was re-read
+        if "id" in book:
+            for i, stored in enumerate(self.books):
+                if stored.get("id") == book["id"]:
+                    return i
+        return self.books.index(book)
+
+    def _remove(self, book):
+        try:
+            position = self._position(book)
+        except ValueError:
+            return  # already gone
+        self.stats.remove(self.books.pop(position))
+
+    def _replace(self, book):
+        position = self._position(book)
+        self.books[position] = book
+
+    def delete(self, book):
+        self._remove(book)
+        self._write()
+
+    def update(self, book):
+        self._replace(book)
+        # The old values are gone if the dict was edited in place
+        self.stats = LibraryStats.from_books(self.books)
+        self._write()
+
+    def replace_all(self, books):
+        self.books = list(books)
+        self.stats = LibraryStats.from_books(self.books)
+        self._write()
+
+    def write_batch(self, inserts=(), updates=(), deletes=(), bases=None):
+        # The whole batch costs a single rewrite of the file. If another
+        # process rewrote it meanwhile, apply the batch on top of its version
+        if self.stats is None or self.changed_since_load():
+            self.load()
+        bases = bases or {}
+        self.books.extend(inserts)
+        for book in inserts:
+            self.stats.add(book)
+        for book in updates:
+            try:
+                position = self._position(book)
+            except ValueError:
+                continue  # removed by another process
+            self.books[position] = merge_update(self.books[position], bases.get(book["id"]), book)
+        for book in deletes:
+            self._remove(book)
+        if updates:
+            self.stats = LibraryStats.from_books(self.books)
+        self._write()
+
+
+# SQLite backend: one row per book, single-row transactions
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    publication_year INTEGER,
+    genre TEXT,
+    read_status INTEGER NOT NULL DEFAULT 0,
+    added_date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_books_title ON books(title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_books_author ON books(author COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_books_genre ON books(genre);
+CREATE INDEX IF NOT EXISTS idx_books_year ON books(publication_year);
+CREATE INDEX IF NOT EXISTS idx_books_read ON books(read_status);
+CREATE TABLE IF NOT EXISTS stats (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _book_row(book):
+    return (
+        book["title"],
+        book["author"],
+        to_year(book.get("publication_year")),
+        book.get("genre"),
+        1 if book.get("read_status") else 0,
+        book.get("added_date"),
+    )
+
+
+class SqliteStorage(LibraryStorage):
+    def __init__(self, path=LIBRARY_DB):
+        self.path = path
+        # Streamlit reruns the script on different threads of the same session
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.data_version = None
+
+    def _data_version(self):
+        # Changes only when another connection commits to the database
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed_since_load(self):
+        return self._data_version() != self.data_version
+
+    def _select_books(self):
+        return self.conn.execute(
+            "SELECT id, title, author, publication_year, genre, read_status, added_date "
+            "FROM books ORDER BY id"
+        )
+
+    @staticmethod
+    def _row_book(row):
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "author": row["author"],
+            "publication_year": row["publication_year"],
+            "genre": row["genre"],
+            "read_status": bool(row["read_status"]),
+            "added_date": row["added_date"],
+        }
+
+    def load(self):
+        self.data_version = self._data_version()
+        return [self._row_book(row) for row in self._select_books()]
+
+    def iter_books(self, chunk_size=5000):
+        # Straight from a cursor, so only one chunk of rows is in memory
+        cursor = self._select_books()
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [self._row_book(row) for row in rows]
+
+    def _bump_stats(self, book, sign):
+        self._apply_stat_deltas(stat_deltas(book, sign))
+
+    def _apply_stat_deltas(self, deltas):
+        # Runs inside the caller's transaction so stats never drift from the rows
+        for kind, key, delta in deltas:
+            key = str(key)
+            self.conn.execute(
+                "INSERT INTO stats (kind, key, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (kind, key) DO UPDATE SET count = count + excluded.count",
+                (kind, key, delta),
+            )
+            if delta < 0:
+                self.conn.execute(
+                    "DELETE FROM stats WHERE kind = ? AND key = ? AND count <= 0", (kind, key)
+                )
+
+    def _insert_row(self, book):
+        if book.get("id") is not None:
+            # Keep an id handed out by the caller (see shared_store.new_book_id)
+            self.conn.execute(
+                "INSERT INTO books (title, author, publication_year, genre, read_status, added_date, id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                _book_row(book) + (book["id"],),
+            )
+            return
+        cursor = self.conn.execute(
+            "INSERT INTO books (title, author, publication_year, genre, read_status, added_date) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            _book_row(book),
+        )
+        book["id"] = cursor.lastrowid
+
+    def _stored_book(self, book_id):
+        row = self.conn.execute(
+            "SELECT id, title, author, publication_year, genre, read_status, added_date FROM books WHERE id = ?",
+            (book_id,),
+        ).fetchone()
+        return self._row_book(row) if row else None
+
+    def insert(self, book):
+        with self.conn:
+            self._insert_row(book)
+            self._bump_stats(book, 1)
+
+    def _insert_rows(self, books):
+        # One stats update per (kind, key) for the whole batch
+        totals = {}
+        for book in books:
+            self._insert_row(book)
+            for kind, key, delta in stat_deltas(book, 1):
+                totals[(kind, key)] = totals.get((kind, key), 0) + delta
+        self._apply_stat_deltas([(kind, key, delta) for (kind, key), delta in totals.items()])
+
+    def insert_many(self, books):
+        with self.conn:
+            self._insert_rows(books)
+
+    def _delete_row(self, book):
+        old = self._stored_book(book["id"])
+        if old is None:
+            return
+        self.conn.execute("DELETE FROM books WHERE id = ?", (book["id"],))
+        self._bump_stats(old, -1)
+
+    def delete(self, book):
+        with self.conn:
+            self._delete_row(book)
+
+    def _update_row(self, book, base=None):
+        old = self._stored_book(book["id"])
+        book = merge_update(old, base, book)
+        self.conn.execute(
+            "UPDATE books SET title = ?, author = ?, publication_year = ?, genre = ?, "
+            "read_status = ?, added_date = ? WHERE id = ?",
+            _book_row(book) + (book["id"],),
+        )
+        if old is not None:
+            self._bump_stats(old, -1)
+            self._bump_stats(book, 1)
+
+    def update(self, book):
+        with self.conn:
+            self._update_row(book)
+
+    def write_batch(self, inserts=(), updates=(), deletes=(), bases=None):
+        # The whole batch is one transaction
+        bases = bases or {}
+        with self.conn:
+            if inserts:
+                self._insert_rows(inserts)
+            for book in updates:
+                self._update_row(book, bases.get(book["id"]))
+            for book in deletes:
+                self._delete_row(book)
+
+    def replace_all(self, books):
+        # One transaction, so a failure part way never leaves an empty library
+        with self.conn:
+            self.conn.execute("DELETE FROM books")
+            self.conn.execute("DELETE FROM stats")
+            self._insert_rows(books)
+
+    def _rebuild_stats(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM stats")
+            self.conn.execute(
+                "INSERT INTO stats (kind, key, count) SELECT 'total', '', COUNT(*) FROM books"
+            )
+            self.conn.execute(
+                "INSERT INTO stats (kind, key, count) "
+                "SELECT 'read', '', COUNT(*) FROM books WHERE read_status = 1"
+            )
+            # Missing genres and authors count under '', as stat_deltas() does
+            for kind, column in (("genre", "COALESCE(genre, '')"), ("author", "COALESCE(author, '')")):
+                self.conn.execute(
+                    f"INSERT INTO stats (kind, key, count) SELECT '{kind}', {column}, COUNT(*) "
+                    f"FROM books GROUP BY {column}"
+                )
+            # Floored like book_decade(): SQL division rounds -725 to -720, not -730
+            decade = "publication_year - ((publication_year % 10) + 10) % 10"
+            self.conn.execute(
+                f"INSERT INTO stats (kind, key, count) SELECT 'decade', {decade}, COUNT(*) "
+                f"FROM books WHERE publication_year IS NOT NULL GROUP BY {decade}"
+            )
+            self.conn.execute("DELETE FROM stats WHERE count <= 0")
+        self.set_meta("stats_ready", STATS_FORMAT)
+
+    def load_stats(self):
+        # Databases created before the stats table (or its current keys) existed are counted once
+        if self.get_meta("stats_ready") != STATS_FORMAT:
+            self._rebuild_stats()
+        stats = LibraryStats()
+        for row in self.conn.execute("SELECT kind, key, count FROM stats"):
+            key = row["key"]
+            if row["kind"] == "decade":
+                key = int(key)
+            stats.apply([(row["kind"], key, row["count"])])
+        return stats
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+# Append-only journal backend: every change is one appended line, replayed on
+# load on top of the last snapshot, and folded into a new snapshot in the background
+FSYNC_BATCH = 32          # fsync after this many appended records...
+FSYNC_INTERVAL = 1.0      # ...or once this many seconds have passed
+COMPACT_THRESHOLD = 1000  # journal records before a background compaction
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class JournalStorage(LibraryStorage):
+    def __init__(self, snapshot_path=LIBRARY_SNAPSHOT, journal_path=LIBRARY_JOURNAL,
+                 legacy_path=LIBRARY_JSON, compact_threshold=COMPACT_THRESHOLD):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.legacy_path = legacy_path
+        self.compact_threshold = compact_threshold
+        self.books = {}        # id -> the storage's own copy of each book
+        self.stats = None
+        self.seq = 0           # sequence number of the last record
+        self.next_id = 1
+        self.journal_records = 0
+        self.pending_sync = 0
+        self.last_sync = time.monotonic()
+        self.journal = None
+        self.fingerprint = None
+        self.lock = threading.RLock()
+        self.compactor = None
+
+    # Loading: snapshot + journal replay
+    def _read_snapshot(self):
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r") as file:
+                snapshot = json.load(file)
+            return snapshot["seq"], snapshot["books"]
+        # First run: start from the plain library.json
+        books = []
+        if os.path.exists(self.legacy_path):
+            with open(self.legacy_path, "r") as file:
+                books = json.load(file)
+        return 0, books
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "add":
+            book = record["book"]
+            self.books[book["id"]] = book
+            self.stats.add(book)
+            self.next_id = max(self.next_id, book["id"] + 1)
+        elif op == "remove":
+            old = self.books.pop(record["id"], None)
+            if old is not None:
+                self.stats.remove(old)
+        elif op == "update":
+            book = record["book"]
+            old = self.books.get(book["id"])
+            if old is not None:
+                self.stats.replace(old, book)
+                self.books[book["id"]] = book
+        self.seq = record["seq"]
+
+    def _replay(self, snapshot_seq):
+        """Apply journal records newer than the snapshot; drop a torn tail."""
+        if not os.path.exists(self.journal_path):
+            return
+        good_offset = 0
+        with open(self.journal_path, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good_offset += len(line)
+                self.journal_records += 1
+                if record["seq"] > snapshot_seq:
+                    self._apply(record)
+        if good_offset != os.path.getsize(self.journal_path):
+            # An interrupted write left a partial record behind
+            with open(self.journal_path, "r+b") as file:
+                file.truncate(good_offset)
+
+    def load(self):
+        with self.lock:
+            fingerprint = self._fingerprint()
+            if self.stats is not None and fingerprint == self.fingerprint:
+                return [dict(book) for book in self.books.values()]
+            self._close_journal()
+            snapshot_seq, books = self._read_snapshot()
+            self.books = {}
+            self.stats = LibraryStats()
+            self.seq = snapshot_seq
+            self.journal_records = 0
+            needs_ids = False
+            for book in books:
+                if "id" not in book:
+                    needs_ids = True
+                    continue
+                self.books[book["id"]] = book
+                self.next_id = max(self.next_id, book["id"] + 1)
+            if needs_ids:
+                for book in books:
+                    if "id" not in book:
+                        book["id"] = self.next_id
+                        self.next_id += 1
+                        self.books[book["id"]] = book
+            for book in self.books.values():
+                self.stats.add(book)
+            self._replay(snapshot_seq)
+            if needs_ids or not os.path.exists(self.snapshot_path):
+                # Ids must be on disk before any journal record refers to them
+                self._compact()
+            self.fingerprint = self._fingerprint()
+            return [dict(book) for book in self.books.values()]
+
+    def load_stats(self):
+        self._ensure_loaded()
+        return LibraryStats.from_json(self.stats.to_json())
+
+    def _ensure_loaded(self):
+        if self.stats is None:
+            self.load()
+
+    def _fingerprint(self):
+        return (file_fingerprint(self.snapshot_path), file_fingerprint(self.journal_path))
+
+    def changed_since_load(self):
+        with self.lock:
+            return self._fingerprint() != self.fingerprint
+
+    # Writing: one appended line per change, fsync in batches
+    def _append(self, record):
+        if self.journal is None:
+            self.journal = open(self.journal_path, "a")
+        self.seq += 1
+        record["seq"] = self.seq
+        self.journal.write(json.dumps(record) + "\n")
+        self.journal.flush()
+        self.journal_records += 1
+        self.pending_sync += 1
+        if self.pending_sync >= FSYNC_BATCH or time.monotonic() - self.last_sync >= FSYNC_INTERVAL:
+            self.sync()
+        self.fingerprint = self._fingerprint()
+        if self.journal_records >= self.compact_threshold:
+            self.compact_in_background()
+
+    def sync(self):
+        with self.lock:
+            if self.journal is not None and self.pending_sync:
+                os.fsync(self.journal.fileno())
+            self.pending_sync = 0
+            self.last_sync = time.monotonic()
+
+    def _add(self, book):
+        if book.get("id") is None:
+            book["id"] = self.next_id
+        self.next_id = max(self.next_id, book["id"] + 1)
+        stored = dict(book)
+        self._append({"op": "add", "book": stored})
+        self.books[stored["id"]] = stored
+        self.stats.add(stored)
+
+    def insert(self, book):
+        with self.lock:
+            self._ensure_loaded()
+            self._add(book)
+
+    def insert_many(self, books):
+        with self.lock:
+            self._ensure_loaded()
+            for book in books:
+                self._add(book)
+            self.sync()
+
+    def delete(self, book):
+        with self.lock:
+            self._ensure_loaded()
+            old = self.books.get(book["id"])
+            if old is None:
+                return
+            self._append({"op": "remove", "id": book["id"]})
+            del self.books[book["id"]]
+            self.stats.remove(old)
+
+    def update(self, book):
+        with self.lock:
+            self._ensure_loaded()
+            old = self.books.get(book["id"])
+            if old is None:
+                return
+            stored = dict(book)
+            self._append({"op": "update", "book": stored})
+            self.books[stored["id"]] = stored
+            self.stats.replace(old, stored)
+
+    def write_batch(self, inserts=(), updates=(), deletes=(), bases=None):
+        with self.lock:
+            # Pick up records another process appended before adding ours
+            if self.stats is not None and self._fingerprint() != self.fingerprint:
+                self.load()
+            self._ensure_loaded()
+            bases = bases or {}
+            updates = [merge_update(self.books.get(book["id"]), bases.get(book["id"]), book) for book in updates]
+            super().write_batch(inserts, updates, deletes)
+
+    def replace_all(self, books):
+        with self.lock:
+            self._ensure_loaded()
+            self.books = {}
+            self.stats = LibraryStats()
+            for book in books:
+                if "id" not in book:
+                    book["id"] = self.next_id
+                    self.next_id += 1
+                self.next_id = max(self.next_id, book["id"] + 1)
+                self.books[book["id"]] = dict(book)
+                self.stats.add(book)
+            self._compact()
+
+    # Compaction: fold the journal into a new snapshot
+    def _compact(self):
+        # Callers hold file_lock (load, replace_all) or take it (_compact_shared)
+        with self.lock:
+            books = list(self.books.values())  # stored dicts are never edited in place
+            seq = self.seq
+        # Serializing the snapshot does not block writers
+        _write_atomic(self.snapshot_path, json.dumps({"seq": seq, "books": books}))
+        with self.lock:
+            # Keep only records written while the snapshot was being saved
+            self.sync()
+            self._close_journal()
+            tail = []
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, "r") as file:
+                    for line in file:
+                        if json.loads(line)["seq"] > seq:
+                            tail.append(line)
+            _write_atomic(self.journal_path, "".join(tail))
+            self.journal_records = len(tail)
+            self.fingerprint = self._fingerprint()
+
+    def _compact_shared(self):
+        # The journal is replaced, so no other process may append meanwhile;
+        # the file lock is always taken before self.lock, as writers do
+        with self.file_lock:
+            with self.lock:
+                if self.changed_since_load():
+                    self.load()  # fold in what other processes appended
+            self._compact()
+
+    def compact_in_background(self):
+        with self.lock:
+            if self.compactor is not None and self.compactor.is_alive():
+                return self.compactor
+            self.compactor = threading.Thread(target=self._compact_shared, daemon=True)
+            self.compactor.start()
+            return self.compactor
+
+    def _close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def close(self):
+        compactor = self.compactor
+        if compactor is not None:
+            compactor.join()
+        with self.lock:
+            self.sync()
+            self._close_journal()
+
+
+# One-shot migration of the old library.json into SQLite
+def migrate_json_to_sqlite(storage, json_path=LIBRARY_JSON):
+    """Copy books from json_path into storage once. Returns the number of books copied."""
+    if storage.get_meta("migrated_from_json"):
+        return 0
+    count = 0
+    if os.path.exists(json_path):
+        with open(json_path, "r") as file:
+            books = json.load(file)
+        # Only import into an empty database so a rerun can never duplicate rows
+        has_rows = storage.conn.execute("SELECT 1 FROM books LIMIT 1").fetchone()
+        if books and not has_rows:
+            storage.insert_many(books)
+            count = len(books)
+    storage.set_meta("migrated_from_json", json_path)
+    return count
+
+
+def get_storage(backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend == "json":
+        return JsonStorage()
+    if backend == "journal":
+        storage = JournalStorage()
+        atexit.register(storage.close)
+        return storage
+    if backend == "sqlite":
+        storage = SqliteStorage()
+        migrate_json_to_sqlite(storage)
+        return storage
+    raise ValueError(f"Unknown library backend: {backend}")
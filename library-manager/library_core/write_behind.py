@@ -0,0 +1,149 @@
+import atexit
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+WRITE_DELAY = 0.25     # quiet period before pending changes are flushed...
+MAX_WRITE_DELAY = 2.0  # ...but never hold a change back longer than this
+
+# How a new change folds into the one already pending for the same book
+_MERGE = {
+    (None, "insert"): "insert",
+    (None, "update"): "update",
+    (None, "delete"): "delete",
+    ("insert", "update"): "insert",  # the insert writes the edited dict anyway
+    ("insert", "delete"): None,      # never reached storage, nothing to do
+    ("update", "update"): "update",
+    ("update", "delete"): "delete",
+}
+
+
+class WriteBehindQueue:
+    """Persists library changes on a background thread.
+
+    insert(), update() and delete() only record the change and return, so
+    the UI never waits on disk. Changes made in quick succession are
+    coalesced per book and written with a single storage.write_batch() once
+    no new change has arrived for `delay` seconds. An update may name the
+    book it was made to (its base), so storage can keep fields another
+    process changed meanwhile. flush() writes everything
+    synchronously and is also run at interpreter exit. guard() is entered
+    around every write, e.g. to hold a lock shared with other processes.
+    """
+
+    def __init__(self, storage, delay=WRITE_DELAY, max_delay=MAX_WRITE_DELAY, guard=nullcontext):
+        self.storage = storage
+        self.guard = guard
+        self.delay = delay
+        self.max_delay = max_delay
+        self.pending = {}  # book key -> (op, book, base), in submission order
+        self.errors = []
+        self.flushes = 0
+        self.condition = threading.Condition()
+        self.write_lock = threading.RLock()  # held while storage is being written
+        self.last_change = 0.0
+        self.failed = False  # last flush failed: wait for a new change or flush()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="library-write-behind", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    # Recording changes
+    def _merge(self, op, book, base=None):
+        # Books are matched by their id, so an edited copy replaces the original
+        key = ("id", book["id"]) if book.get("id") is not None else ("object", id(book))
+        current, _, current_base = self.pending.get(key, (None, None, None))
+        merged = _MERGE.get((current, op), op)
+        if merged is None:
+            del self.pending[key]
+        else:
+            # Coalesced updates are all relative to the oldest base
+            self.pending[key] = (merged, book, current_base if current_base is not None else base)
+
+    def _submit(self, op, book, base=None):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("write-behind queue is closed")
+            self._merge(op, book, base)
+            self.last_change = time.monotonic()
+            self.failed = False
+            self.condition.notify()
+
+    def insert(self, book):
+        self._submit("insert", book)
+
+    def update(self, book, base=None):
+        self._submit("update", book, base)
+
+    def delete(self, book):
+        self._submit("delete", book)
+
+    def __len__(self):
+        with self.condition:
+            return len(self.pending)
+
+    def pop_errors(self):
+        with self.condition:
+            errors, self.errors = self.errors, []
+        return errors
+
+    # Writing
+    def _run(self):
+        while True:
+            with self.condition:
+                while (not self.pending or self.failed) and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                # Debounce: wait for a quiet period, bounded by max_delay
+                deadline = time.monotonic() + self.max_delay
+                while not self.closed:
+                    wait = min(self.last_change + self.delay, deadline) - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self.condition.wait(wait)
+            self.flush()
+
+    def flush(self):
+        """Write every pending change now. Returns False if the write failed."""
+        with self.write_lock:
+            with self.condition:
+                batch, self.pending = self.pending, {}
+            if not batch:
+                return True
+            inserts, updates, deletes, bases = [], [], [], {}
+            for op, book, base in batch.values():
+                {"insert": inserts, "update": updates, "delete": deletes}[op].append(book)
+                if op == "update" and base is not None:
+                    bases[book["id"]] = base
+            try:
+                with self.guard():
+                    self.storage.write_batch(inserts, updates, deletes, bases)
+            except Exception as e:
+                with self.condition:
+                    # Put the batch back in front of anything queued meanwhile
+                    newer, self.pending = self.pending, batch
+                    for op, book, base in newer.values():
+                        self._merge(op, book, base)
+                    self.errors.append(e)
+                    self.failed = True
+                return False
+            self.flushes += 1
+            return True
+
+    @contextmanager
+    def exclusive(self):
+        """Flush, then keep the writer thread off storage so the caller can use it directly."""
+        with self.write_lock:
+            self.flush()
+            yield self.storage
+
+    def close(self):
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        self.flush()
+        atexit.unregister(self.close)
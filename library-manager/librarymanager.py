@@ -1,13 +1,15 @@
 import streamlit as st
-import pandas as pd
-import json
 import os
 from datetime import datetime
-import time
-import requests
-import plotly.express as px
-import plotly.graph_objects as go
-from streamlit_lottie import st_lottie
+import html
+import io
+from library_core import (ConflictError, EXPORT_FORMATS, SEARCH_FIELDS, YEAR_MAX, YEAR_MIN, chunked,
+                          get_shared_store, import_books, to_year, write_export)
+from asset_cache import asset_cache
+from figure_cache import figure_cache
+from profiling import begin_rerun, end_rerun, phase, profile_mode, render_panel, timed
+# pandas, plotly and streamlit_lottie are imported where they are first needed,
+# so a rerun that draws no chart never loads them
 
 # Set page configuration
 st.set_page_config(
@@ -17,6 +19,12 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Opt-in profiling (?profile=1 or ?profile=cprofile, or LIBRARY_PROFILE)
+PROFILE_MODE = profile_mode(st.query_params.get("profile"))
+if PROFILE_MODE:
+    st.session_state.profile_rerun = st.session_state.get('profile_rerun', 0) + 1
+begin_rerun(PROFILE_MODE, st.session_state.get('profile_rerun', 0))
+
 # Custom CSS for styling
 st.markdown("""
 <style>
@@ -76,18 +84,16 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Functions
-def load_lottieurl(url):
-    try:
-        r = requests.get(url)
-        if r.status_code != 200:
-            return None
-        return r.json()
-    except:
-        return None
+LOTTIE_FALLBACK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "book_animation.json")
+
+@timed("lottie_fetch")
+def load_lottieurl(url, fallback_path=LOTTIE_FALLBACK):
+    # Served from memory/disk; the network is only hit in the background
+    return asset_cache.get_json(url, fallback_path)
+
+PROFILE_HISTORY = 20
 
 # Session state initialization
-if 'library' not in st.session_state:
-    st.session_state.library = []
 if 'search_results' not in st.session_state:
     st.session_state.search_results = []
 if 'book_added' not in st.session_state:
@@ -96,24 +102,31 @@ if 'book_removed' not in st.session_state:
     st.session_state.book_removed = False
 if 'current_view' not in st.session_state:
     st.session_state.current_view = "library"
+if 'library_version' not in st.session_state:
+    st.session_state.library_version = 0
+if 'store' not in st.session_state:
+    # One library per app process, shared by every browser session
+    st.session_state.store = get_shared_store()
+    # Read-only; the indexes behind it are shared too, never built per session
+    st.session_state.library = st.session_state.store.view()
 
-# Load and Save library
-def load_library():
+# Load library
+@timed()
+def sync_library():
+    """Pick up changes other processes made to the stored library."""
+    store = st.session_state.store
     try:
-        if os.path.exists('library.json'):
-            with open('library.json', 'r') as file:
-                st.session_state.library = json.load(file)
+        store.refresh()
     except Exception as e:
         st.error(f"Error loading library: {e}")
-
-def save_library():
-    try:
-        with open('library.json', 'w') as file:
-            json.dump(st.session_state.library, file)
-    except Exception as e:
-        st.error(f"Error saving library: {e}")
+    # Keys this session's caches; the shared indexes are always current
+    st.session_state.library_version = store.version
 
 # Add, Remove, Search Book
+SEARCH_BY_FIELDS = {"Title": "title", "Author": "author", "Genre": "genre", "All": SEARCH_FIELDS}
+SEARCH_RESULT_LIMIT = 200
+
+@timed()
 def add_book(title, author, publication_year, genre, read_status):
     book = {
         "title": title,
@@ -123,123 +136,382 @@ def add_book(title, author, publication_year, genre, read_status):
         "read_status": read_status,
         "added_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
-    st.session_state.library.append(book)
-    save_library()
+    # Saved in the background; the shared indexes pick the book up from the change log
+    st.session_state.store.insert(book)
+    sync_library()
     st.session_state.book_added = True
-    time.sleep(0.5)
 
-def remove_book(index):
-    if 0 <= index < len(st.session_state.library):
-        del st.session_state.library[index]
-        save_library()
+@timed()
+def remove_book(book_id):
+    book = st.session_state.library.get(book_id)
+    if book is not None:
+        # False means another session removed it first; either way it is gone
+        st.session_state.store.delete(book)
+        sync_library()
         st.session_state.book_removed = True
 
+@timed()
+def edit_book(book_id, changes, base=None):
+    """Apply {field: value} edits made to base (the book as the user last saw it).
+
+    Fields edited elsewhere meanwhile are merged; editing the same field warns.
+    """
+    book = base if base is not None else st.session_state.library.get(book_id)
+    if book is None or not changes:
+        return
+    try:
+        st.session_state.store.update(book, changes)
+    except ConflictError as e:
+        st.warning(f"Not saved: {e}. The latest version is shown below.")
+    sync_library()
+
+def toggle_read_status(book_id):
+    book = st.session_state.library.get(book_id)
+    if book is not None:
+        edit_book(book_id, {"read_status": not book["read_status"]})
+
+DUPLICATE_GROUPS_SHOWN = 100
+
+SIMILAR_BOOKS = 5
+
+@timed()
+def similar_books(book, k=SIMILAR_BOOKS):
+    return st.session_state.library.similar(book, k)
+
+@timed()
 def search_books(search_term, search_by):
-    search_term = search_term.lower()
-    results = []
-
-    for book in st.session_state.library:
-        if search_by == "Title" and search_term in book["title"].lower():
-            results.append(book)
-        elif search_by == "Author" and search_term in book["author"].lower():
-            results.append(book)
-        elif search_by == "Genre" and search_term in book["genre"].lower():
-            results.append(book)
-    st.session_state.search_results = results
+    fields = SEARCH_BY_FIELDS.get(search_by, SEARCH_FIELDS)
+    st.session_state.search_results = st.session_state.library.search(
+        search_term, fields=fields, limit=SEARCH_RESULT_LIMIT
+    )
+
+@timed()
+def import_library_file(uploaded_file):
+    progress = st.progress(0.0, text="Importing books...")
+
+    def on_batch(books, result):
+        sync_library()
+        done = min(uploaded_file.tell() / uploaded_file.size, 1.0) if uploaded_file.size else 1.0
+        progress.progress(done, text=f"Imported {result.imported} of {result.rows} rows...")
+
+    try:
+        result = import_books(uploaded_file, uploaded_file.name, st.session_state.store,
+                              existing_books=st.session_state.library.books(), on_batch=on_batch)
+    except Exception as e:
+        st.error(f"Error importing books: {e}")
+        return None
+    progress.progress(1.0, text="Import finished")
+    return result
+
+EXPORT_LABELS = {"CSV": "csv", "JSON Lines": "jsonl", "Parquet": "parquet"}
+
+@timed()
+def export_library(fmt):
+    # Encoded chunk by chunk; only the finished file is held for the download
+    export_file = io.BytesIO()
+    write_export(chunked(st.session_state.library.books()), fmt, export_file)
+    export_file.seek(0)
+    return export_file
+
+# Library pagination
+PAGE_SIZES = [10, 25, 50, 100]
+GENRES = ["Fiction", "Non-Fiction", "Science", "Technology", "Romance", "Poetry", "Self-help", "Art", "Religion", "History", "Other"]
+SORT_KEYS = {
+    "Date Added": None,
+    "Title": lambda book: str(book["title"]).lower(),
+    "Author": lambda book: str(book["author"]).lower(),
+    "Publication Year": lambda book: to_year(book["publication_year"]) or 0,
+}
+
+QUERY_SORT = {"Date Added": "added", "Title": "title", "Author": "author", "Publication Year": "year"}
+
+@timed()
+def get_filtered_page(filters, page, page_size, sort_by, descending):
+    # Answered from the secondary indexes, without scanning the library
+    return st.session_state.library.query(
+        sort_by=QUERY_SORT[sort_by], descending=descending,
+        limit=page_size, offset=(page - 1) * page_size, **filters
+    )
+
+def library_filters():
+    library = st.session_state.library
+    filters = {}
+    with st.expander("Filter books"):
+        col1, col2 = st.columns(2)
+        with col1:
+            author = st.text_input("Author (exact name)")
+            genres = st.multiselect("Genres", library.genres())
+        with col2:
+            read_filter = st.radio("Read Status", ["All", "Read", "Unread"], horizontal=True)
+            bounds = library.year_bounds()
+            if bounds and bounds[0] < bounds[1]:
+                year_range = st.slider("Publication Year", bounds[0], bounds[1], bounds)
+                if tuple(year_range) != tuple(bounds):
+                    filters['year_min'], filters['year_max'] = year_range
+    if author.strip():
+        filters['author'] = author
+    if genres:
+        filters['genre'] = genres
+    if read_filter != "All":
+        filters['read_status'] = read_filter == "Read"
+    return filters
+
+@timed()
+def get_library_page(page, page_size, sort_by, descending):
+    library = st.session_state.library
+    start = (page - 1) * page_size
+    if SORT_KEYS[sort_by] is None:
+        return library.page(start, page_size, descending)
+    # The sorted order is shared by every session until the library changes
+    return library.sorted_page(sort_by, SORT_KEYS[sort_by], descending, start, page_size)
+
+def book_card_html(book):
+    read = book["read_status"]
+    return (
+        "<div class='book-card'>"
+        f"<h3>{html.escape(str(book['title']))}</h3>"
+        f"<p><strong>Author:</strong> {html.escape(str(book['author']))}</p>"
+        f"<p><strong>Year:</strong> {html.escape(str(book['publication_year'] or 'Unknown'))}</p>"
+        f"<p><strong>Genre:</strong> {html.escape(str(book['genre']))}</p>"
+        f"<span class='{'read-badge' if read else 'unread-badge'}'>{'Read' if read else 'Unread'}</span>"
+        "</div>"
+    )
+
+def start_editing(book_id):
+    book = st.session_state.library.get(book_id)
+    if book is not None:
+        st.session_state.editing_book = book_id
+        # The form is checked against this copy, not the book as it is at save time
+        st.session_state.editing_base = dict(book)
+
+def stop_editing():
+    st.session_state.editing_book = None
+    st.session_state.editing_base = None
+
+def save_edit(book_id):
+    book = st.session_state.get('editing_base')
+    if book is not None and book["id"] == book_id:
+        edited = {
+            "title": st.session_state[f"edit-title-{book_id}"].strip(),
+            "author": st.session_state[f"edit-author-{book_id}"].strip(),
+            "genre": st.session_state[f"edit-genre-{book_id}"],
+            "read_status": st.session_state[f"edit-read-{book_id}"],
+        }
+        if not edited["title"] or not edited["author"]:
+            st.error("Please fill all the fields!")
+            return
+        # Only fields changed in the form are sent, against the book the form
+        # was opened on, so edits other sessions made meanwhile merge or conflict
+        changes = {field: value for field, value in edited.items() if value != book.get(field)}
+        year = None if st.session_state[f"edit-year-unknown-{book_id}"] else int(st.session_state[f"edit-year-{book_id}"])
+        if year != to_year(book.get("publication_year")):
+            if year is not None and not YEAR_MIN <= year <= YEAR_MAX:
+                st.error(f"Publication year must be between {YEAR_MIN} and {YEAR_MAX}.")
+                return
+            changes["publication_year"] = year
+        edit_book(book_id, changes, base=book)
+    stop_editing()
+
+def edit_form(book):
+    book_id = book["id"]
+    with st.form(key=f"edit-{book_id}"):
+        col1, col2 = st.columns(2)
+        with col1:
+            st.text_input("Book Title", value=book["title"], max_chars=100, key=f"edit-title-{book_id}")
+            st.text_input("Author", value=book["author"], max_chars=100, key=f"edit-author-{book_id}")
+            # Any year an import accepts (BC years, no year at all) survives an edit;
+            # save_edit checks the range, as a stored year may lie outside it
+            year = to_year(book.get("publication_year"))
+            st.number_input("Publication Year", step=1, value=datetime.now().year if year is None else year,
+                            key=f"edit-year-{book_id}")
+            st.checkbox("Unknown year", value=year is None, key=f"edit-year-unknown-{book_id}")
+        with col2:
+            genres = GENRES if book.get("genre") in GENRES else GENRES + [book.get("genre")]
+            st.selectbox("Genre", genres, index=genres.index(book.get("genre")), key=f"edit-genre-{book_id}")
+            st.checkbox("Read", value=bool(book["read_status"]), key=f"edit-read-{book_id}")
+        save_col, cancel_col = st.columns(2)
+        with save_col:
+            st.form_submit_button("Save", on_click=save_edit, args=(book_id,))
+        with cancel_col:
+            st.form_submit_button("Cancel", on_click=stop_editing)
+
+def book_card(book):
+    book_id = book["id"]
+    with st.container():
+        if st.session_state.get('editing_book') == book_id:
+            edit_form(st.session_state.get('editing_base') or book)
+            return
+        st.markdown(book_card_html(book), unsafe_allow_html=True)
+        read_col, edit_col, remove_col = st.columns(3)
+        with read_col:
+            st.button("Mark unread" if book["read_status"] else "Mark read", key=f"read-{book_id}",
+                      on_click=toggle_read_status, args=(book_id,))
+        with edit_col:
+            st.button("✏️ Edit", key=f"edit-{book_id}-open", on_click=start_editing, args=(book_id,))
+        with remove_col:
+            st.button("🗑️ Remove", key=f"remove-{book_id}", on_click=remove_book, args=(book_id,))
+
+def change_page(delta):
+    st.session_state.library_page = max(1, st.session_state.library_page + delta)
 
 # Get Library Statistics
+@timed()
 def get_library_stats():
-    total_books = len(st.session_state.library)
-    read_books = sum(1 for book in st.session_state.library if book['read_status'])
-    percent_read = (read_books / total_books) * 100 if total_books > 0 else 0
-
-    genres = {}
-    authors = {}
-    decades = {}
-
-    for book in st.session_state.library:
-        genres[book['genre']] = genres.get(book['genre'], 0) + 1
-        authors[book['author']] = authors.get(book['author'], 0) + 1
-        decade = (int(book['publication_year']) // 10) * 10
-        decades[decade] = decades.get(decade, 0) + 1
-
-    return {
-        'total_books': total_books,
-        'read_books': read_books,
-        'percent_read': percent_read,
-        'genres': genres,
-        'authors': authors,
-        'decades': decades
-    }
+    # Kept up to date by every change to the store, so this never walks the library
+    return st.session_state.library.stats()
 
 # Create Visualizations
-def create_visualization(stats):
+# Each builder takes the chart data as tuples, which also form the cache key
+@timed()
+def build_read_status_figure(read_books, unread_books):
+    import plotly.graph_objects as go
+    fig_read_status = go.Figure(data=[go.Pie(
+        labels=['Read', 'Unread'],
+        values=[read_books, unread_books],
+        hole=0.4,
+        marker_colors=['#10B981', '#F87171']
+    )])
+    fig_read_status.update_layout(
+        title_text="Read vs Unread Books",
+        showlegend=True,
+        height=400
+    )
+    return fig_read_status
+
+@timed()
+def build_genres_figure(genre_items):
+    import pandas as pd
+    import plotly.express as px
+    genres_df = pd.DataFrame(genre_items, columns=['Genre', 'Count'])
+    fig_genres = px.bar(
+        genres_df,
+        x='Genre',
+        y='Count',
+        color='Count',
+        color_continuous_scale=px.colors.sequential.Blues
+    )
+    fig_genres.update_layout(
+        title_text='Books by Genre',
+        height=400
+    )
+    return fig_genres
+
+@timed()
+def build_decades_figure(decade_items):
+    import pandas as pd
+    import plotly.express as px
+    decades_df = pd.DataFrame({
+        'Decade': [f"{decade}s" for decade, _ in decade_items],
+        'Count': [count for _, count in decade_items]
+    })
+    fig_decades = px.line(
+        decades_df,
+        x='Decade',
+        y='Count',
+        markers=True,
+        line_shape="spline"
+    )
+    fig_decades.update_layout(
+        title_text='Books by Publication Decade',
+        height=400
+    )
+    return fig_decades
+
+@timed()
+def build_authors_figure(author_items):
+    import pandas as pd
+    import plotly.express as px
+    authors_df = pd.DataFrame(author_items, columns=['Author', 'Count'])
+    fig_authors = px.bar(
+        authors_df,
+        x='Count',
+        y='Author',
+        orientation='h'
+    )
+    fig_authors.update_layout(
+        title_text='Top Authors',
+        yaxis={'categoryorder': 'total ascending'},
+        height=400
+    )
+    return fig_authors
+
+@timed()
+def build_read_rates_figure(read_rate_items):
+    import pandas as pd
+    import plotly.express as px
+    read_rates_df = pd.DataFrame(read_rate_items, columns=['Genre', 'Percent Read'])
+    fig_read_rates = px.bar(
+        read_rates_df,
+        x='Genre',
+        y='Percent Read',
+        color_discrete_sequence=['#10B981']
+    )
+    fig_read_rates.update_layout(
+        title_text='Percent Read by Genre',
+        height=400
+    )
+    return fig_read_rates
+
+def series_items(series, value_type=int):
+    return tuple((key, value_type(value)) for key, value in series.items())
+
+@timed()
+def get_chart_data(library):
+    # Group-bys only run again after the library changed
+    cached = st.session_state.get('chart_data')
+    if cached and cached[0] == st.session_state.library_version:
+        return cached[1]
+    counts = library.chart_counts(top_authors=10)
+    chart_data = {
+        'genres': series_items(counts['genres']),
+        'decades': tuple((int(decade), int(count)) for decade, count in counts['decades'].items()),
+        'authors': series_items(counts['authors']),
+        'read_rates': series_items(counts['read_rates'], float),
+    }
+    st.session_state.chart_data = (st.session_state.library_version, chart_data)
+    return chart_data
+
+@timed("charts")
+def create_visualization(stats, library):
     if stats['total_books'] > 0:
         # Pie Chart: Read vs Unread
-        fig_read_status = go.Figure(data=[go.Pie(
-            labels=['Read', 'Unread'],
-            values=[stats['read_books'], stats['total_books'] - stats['read_books']],
-            hole=0.4,
-            marker_colors=['#10B981', '#F87171']
-        )])
-        fig_read_status.update_layout(
-            title_text="Read vs Unread Books",
-            showlegend=True,
-            height=400
-        )
-        st.plotly_chart(fig_read_status, use_container_width=True)
-
-    if stats['genres']:
-        # Bar Chart: Genres
-        genres_df = pd.DataFrame({
-            'Genre': list(stats['genres'].keys()),
-            'Count': list(stats['genres'].values())
-        })
-        fig_genres = px.bar(
-            genres_df,
-            x='Genre',
-            y='Count',
-            color='Count',
-            color_continuous_scale=px.colors.sequential.Blues
-        )
-        fig_genres.update_layout(
-            title_text='Books by Genre',
-            height=400
-        )
-        st.plotly_chart(fig_genres, use_container_width=True)
-
-    if stats['decades']:
-        # Line Chart: Decades
-        decades_df = pd.DataFrame({
-            'Decade': [f"{decade}s" for decade in stats['decades'].keys()],
-            'Count': list(stats['decades'].values())
-        })
-        fig_decades = px.line(
-            decades_df,
-            x='Decade',
-            y='Count',
-            markers=True,
-            line_shape="spline"
-        )
-        fig_decades.update_layout(
-            title_text='Books by Publication Decade',
-            height=400
-        )
-        st.plotly_chart(fig_decades, use_container_width=True)
+        read_counts = (stats['read_books'], stats['total_books'] - stats['read_books'])
+        st.plotly_chart(figure_cache.get(('read_status', read_counts),
+                                         lambda: build_read_status_figure(*read_counts)),
+                        use_container_width=True)
+
+    chart_data = get_chart_data(library)
+    charts = [
+        ('genres', build_genres_figure),      # Bar Chart: Genres
+        ('decades', build_decades_figure),    # Line Chart: Decades
+        ('authors', build_authors_figure),    # Bar Chart: Top Authors
+        ('read_rates', build_read_rates_figure),  # Bar Chart: Read rate per genre
+    ]
+    for name, build in charts:
+        items = chart_data[name]
+        if items:
+            figure = figure_cache.get((name, items), lambda: build(items))
+            st.plotly_chart(figure, use_container_width=True)
 
 # App Start
-load_library()
+# The indexes live on the shared store; a session only checks for changes
+# other processes made and notes the version its caches belong to.
+sync_library()
+for error in st.session_state.store.queue.pop_errors():
+    st.error(f"Error saving library, will retry on the next change: {error}")
 
 # Sidebar Navigation
 st.sidebar.markdown("<h1 style='text-align:center;'>Navigation</h1>", unsafe_allow_html=True)
 lottie_book = load_lottieurl("https://assets9.lottiefiles.com/packages/lf20_jcikwtux.json")
 if lottie_book:
     with st.sidebar:
-        st_lottie(lottie_book, height=200, key='book_animation')
+        with phase("lottie_render"):
+            from streamlit_lottie import st_lottie
+            st_lottie(lottie_book, height=200, key='book_animation')
 
 nav_options = st.sidebar.radio(
     "Choose an option:",
-    ["View Library", "Add Book", "Search Book", "Library Statistics"]
+    ["View Library", "Add Book", "Search Book", "Find Duplicates", "Library Statistics"]
 )
 
 st.markdown("<h1 class='main-header'>Personal Library Manager</h1>", unsafe_allow_html=True)
@@ -250,6 +522,8 @@ elif nav_options == "Add Book":
     st.session_state.current_view = "add"
 elif nav_options == "Search Book":
     st.session_state.current_view = "search"
+elif nav_options == "Find Duplicates":
+    st.session_state.current_view = "duplicates"
 elif nav_options == "Library Statistics":
     st.session_state.current_view = "stats"
 
@@ -257,21 +531,57 @@ elif nav_options == "Library Statistics":
 if st.session_state.current_view == "library":
     st.markdown("<h2 class='sub-header'>Your Library</h2>", unsafe_allow_html=True)
     if st.session_state.library:
-        for idx, book in enumerate(st.session_state.library):
-            with st.container():
-                st.markdown(f"""
-                <div class='book-card'>
-                    <h3>{book['title']}</h3>
-                    <p><strong>Author:</strong> {book['author']}</p>
-                    <p><strong>Year:</strong> {book['publication_year']}</p>
-                    <p><strong>Genre:</strong> {book['genre']}</p>
-                    <span class='{"read-badge" if book["read_status"] else "unread-badge"}'>
-                        {"Read" if book["read_status"] else "Unread"}
-                    </span>
-                    <br><br>
-                    <button onClick="window.location.reload()">Remove</button>
-                </div>
-                """, unsafe_allow_html=True)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            sort_by = st.selectbox("Sort by", list(SORT_KEYS.keys()))
+        with col2:
+            descending = st.checkbox("Descending", value=False)
+        with col3:
+            page_size = st.selectbox("Books per page", PAGE_SIZES, index=1)
+
+        filters = library_filters()
+        if 'library_page' not in st.session_state:
+            st.session_state.library_page = 1
+        if filters:
+            total_books, page_books = get_filtered_page(filters, st.session_state.library_page, page_size, sort_by, descending)
+        else:
+            total_books = len(st.session_state.library)
+        total_pages = max(1, -(-total_books // page_size))
+        if st.session_state.library_page > total_pages:
+            st.session_state.library_page = total_pages
+            if filters:
+                total_books, page_books = get_filtered_page(filters, total_pages, page_size, sort_by, descending)
+        if not filters:
+            page_books = get_library_page(st.session_state.library_page, page_size, sort_by, descending)
+
+        if filters and not page_books:
+            st.info("No books match these filters.")
+        # Only the visible slice is rendered; actions look books up by id
+        with phase("render_cards"):
+            for book in page_books:
+                book_card(book)
+
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            st.button("⬅️ Previous", on_click=change_page, args=(-1,), disabled=st.session_state.library_page <= 1)
+        with page_col:
+            st.number_input("Page", min_value=1, max_value=total_pages, step=1, key='library_page')
+            st.caption(f"Page {st.session_state.library_page} of {total_pages} · {total_books} books")
+        with next_col:
+            st.button("Next ➡️", on_click=change_page, args=(1,), disabled=st.session_state.library_page >= total_pages)
+
+        with st.expander("Export Library"):
+            export_format = EXPORT_LABELS[st.selectbox("Format", list(EXPORT_LABELS))]
+            if st.button("Prepare Export"):
+                with st.spinner("Exporting..."):
+                    st.session_state.library_export = (st.session_state.library_version, export_format,
+                                                       export_library(export_format))
+            # An export is only offered for the library it was built from
+            export_version, built_format, export_file = st.session_state.get('library_export', (None, None, None))
+            if export_file is not None and export_version == st.session_state.library_version and built_format == export_format:
+                mime, extension = EXPORT_FORMATS[export_format]
+                st.download_button("Download Export", data=export_file,
+                                   file_name=f"library{extension}", mime=mime)
     else:
         st.warning("Your library is empty. Add some books!")
 
@@ -286,31 +596,91 @@ if st.session_state.current_view == "add":
             publication_year = st.number_input("Publication Year", min_value=1000, max_value=datetime.now().year, step=1, value=datetime.now().year)
 
         with col2:
-            genre = st.selectbox("Genre", [
-                "Fiction", "Non-Fiction", "Science", "Technology", "Romance", "Poetry", "Self-help", "Art", "Religion", "History", "Other"
-            ])
+            genre = st.selectbox("Genre", GENRES)
             read_status = st.radio("Read Status", ["Read", "Unread"], horizontal=True)
             read_book = True if read_status == "Read" else False
 
+        allow_duplicate = st.checkbox("Add even if it looks like a duplicate")
         submit_button = st.form_submit_button(label="Add Book")
         if submit_button:
             if title and author:
-                add_book(title, author, publication_year, genre, read_book)
-                st.success("Book added successfully!")
+                duplicates = st.session_state.library.check_duplicates({"title": title, "author": author})
+                if (duplicates["exact"] or duplicates["near"]) and not allow_duplicate:
+                    matches = [(book, 1.0) for book in duplicates["exact"]] + duplicates["near"]
+                    st.warning("This book may already be in your library:\n\n" + "\n".join(
+                        f"- {book['title']} by {book['author']} ({book['publication_year']}) - {score:.0%} match"
+                        for book, score in matches[:5]
+                    ))
+                else:
+                    add_book(title, author, publication_year, genre, read_book)
+                    st.success("Book added successfully!")
             else:
                 st.error("Please fill all the fields!")
 
+    st.markdown("<h2 class='sub-header'>Bulk Import</h2>", unsafe_allow_html=True)
+    st.caption("CSV (title, author, publication_year, genre, read_status), JSON Lines, or a Goodreads library export.")
+    uploaded_file = st.file_uploader("Choose a file", type=["csv", "jsonl", "ndjson"])
+    if uploaded_file is not None and st.button("Import Books"):
+        result = import_library_file(uploaded_file)
+        if result:
+            st.success(f"Imported {result.imported} books "
+                       f"({result.duplicates} duplicates skipped, {result.invalid} invalid rows).")
+            for row_number, message in result.errors:
+                st.warning(f"Row {row_number}: {message}")
+
 if st.session_state.current_view == "search":
     st.markdown("<h2 class='sub-header'>Search Books</h2>", unsafe_allow_html=True)
     search_term = st.text_input("Enter search term:")
-    search_by = st.selectbox("Search by", ["Title", "Author", "Genre"])
+    search_by = st.selectbox("Search by", ["All", "Title", "Author", "Genre"])
     if st.button("Search"):
         search_books(search_term, search_by)
     if st.session_state.search_results:
         for book in st.session_state.search_results:
             st.write(f"**Title:** {book['title']} | **Author:** {book['author']} | **Genre:** {book['genre']}")
 
+        st.markdown("<h3>Similar Books</h3>", unsafe_allow_html=True)
+        results = st.session_state.search_results
+        labels = [f"{i}. {book['title']} by {book['author']}" for i, book in enumerate(results, 1)]
+        choice = st.selectbox("Find books similar to", labels)
+        similar = similar_books(results[labels.index(choice)]) if choice is not None else []
+        if similar:
+            for book, score in similar:
+                st.write(f"**Title:** {book['title']} | **Author:** {book['author']} | "
+                         f"**Genre:** {book['genre']} | {score:.0%} similar")
+        else:
+            st.info("No similar books in your library yet.")
+
+if st.session_state.current_view == "duplicates":
+    st.markdown("<h2 class='sub-header'>Find Duplicates</h2>", unsafe_allow_html=True)
+    st.caption("Groups books with the same normalized title and author, plus near matches such as spelled-out numbers or small typos.")
+    if st.button("Scan Library"):
+        with st.spinner("Scanning for duplicates..."), phase("find_duplicates"):
+            st.session_state.duplicate_groups = (st.session_state.library_version,
+                                                 st.session_state.library.find_duplicates())
+    # Results of an earlier scan are dropped once the library has changed
+    scanned_version, groups = st.session_state.get('duplicate_groups', (None, None))
+    if groups is not None and scanned_version == st.session_state.library_version:
+        if groups:
+            st.markdown(f"Found {len(groups)} groups of possible duplicates.")
+            for group in groups[:DUPLICATE_GROUPS_SHOWN]:
+                with st.expander(f"{group[0]['title']} ({len(group)} books)"):
+                    for book in group:
+                        st.markdown(f"- **{book['title']}** by {book['author']} ({book['publication_year']}), "
+                                    f"{book['genre']}, added {book.get('added_date', 'unknown')}")
+            if len(groups) > DUPLICATE_GROUPS_SHOWN:
+                st.caption(f"Showing the first {DUPLICATE_GROUPS_SHOWN} groups.")
+        else:
+            st.success("No duplicates found.")
+
 if st.session_state.current_view == "stats":
     st.markdown("<h2 class='sub-header'>Library Statistics</h2>", unsafe_allow_html=True)
     stats = get_library_stats()
-    create_visualization(stats)
+    create_visualization(stats, st.session_state.library)
+
+# Profiling panel (last, so it covers the whole rerun)
+profiler = end_rerun()
+if profiler is not None:
+    profiler.save()
+    render_panel(profiler, st.session_state.get('profile_history', []))
+    history = st.session_state.get('profile_history', []) + [profiler.total * 1000]
+    st.session_state.profile_history = history[-PROFILE_HISTORY:]
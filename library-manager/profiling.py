@@ -0,0 +1,190 @@
+"""Opt-in per-rerun profiling for the Streamlit app.
+
+Enable with the LIBRARY_PROFILE environment variable or a ?profile= query
+parameter: "1" records phase timings, "cprofile" also runs cProfile. Every
+profiled rerun writes a Chrome trace-event JSON (open it in chrome://tracing
+or ui.perfetto.dev) and, with cProfile, a .pstats snapshot to .profiles/.
+"""
+import cProfile
+import functools
+import io
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_DIR = ".profiles"
+PROFILE_KEEP = 50     # newest files kept in PROFILE_DIR
+TOP_FUNCTIONS = 20    # cProfile rows shown in the panel
+
+# Streamlit runs each rerun on its own thread, so the active profiler is per thread
+_active = threading.local()
+
+
+def profile_mode(query_value=None):
+    """None (off), "timings" or "cprofile" from a query parameter or LIBRARY_PROFILE."""
+    value = (query_value or os.environ.get("LIBRARY_PROFILE") or "").strip().lower()
+    if value in ("", "0", "false", "off"):
+        return None
+    return "cprofile" if value == "cprofile" else "timings"
+
+
+class RerunProfiler:
+    """Phase timings (and optionally cProfile) for one script rerun."""
+
+    def __init__(self, rerun, use_cprofile=False):
+        self.rerun = rerun
+        self.started_at = datetime.now()
+        self.phases = []  # (name, start seconds, duration seconds, depth)
+        self.depth = 0
+        self.total = None
+        self.profile = None
+        self.cprofile_busy = False
+        if use_cprofile:
+            self.profile = cProfile.Profile()
+            try:
+                self.profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler per process, so while
+                # another session (or a debugger) profiles, record timings only
+                self.profile = None
+                self.cprofile_busy = True
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            self.phases.append((name, start - self.start, time.perf_counter() - start, self.depth))
+
+    def finish(self):
+        if self.total is None:
+            self.total = time.perf_counter() - self.start
+            if self.profile is not None:
+                self.profile.disable()
+        return self
+
+    def summary(self):
+        """Phase name -> (calls, total ms), slowest first."""
+        totals = {}
+        for name, _, duration, _ in self.phases:
+            calls, elapsed = totals.get(name, (0, 0.0))
+            totals[name] = (calls + 1, elapsed + duration * 1000)
+        return dict(sorted(totals.items(), key=lambda item: -item[1][1]))
+
+    def trace(self):
+        """Chrome trace-event document for this rerun."""
+        events = [{"name": "rerun", "ph": "X", "ts": 0, "dur": round(self.total * 1e6), "pid": 1, "tid": 1,
+                   "args": {"rerun": self.rerun}}]
+        for name, start, duration, _ in self.phases:
+            events.append({"name": name, "ph": "X", "ts": round(start * 1e6), "dur": round(duration * 1e6),
+                           "pid": 1, "tid": 1})
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "metadata": {"rerun": self.rerun, "started": self.started_at.isoformat(timespec="seconds"),
+                         "total_ms": self.total * 1000},
+        }
+
+    def pstats_bytes(self):
+        """The cProfile snapshot in the format pstats.Stats() and snakeviz read."""
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+    def top_functions(self, limit=TOP_FUNCTIONS):
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def save(self, folder=PROFILE_DIR, prefix="rerun"):
+        os.makedirs(folder, exist_ok=True)
+        base = os.path.join(folder, f"{prefix}-{self.started_at:%Y%m%d-%H%M%S}-{self.rerun}")
+        with open(base + ".json", "w") as file:
+            json.dump(self.trace(), file)
+        if self.profile is not None:
+            with open(base + ".pstats", "wb") as file:
+                file.write(self.pstats_bytes())
+        _prune(folder)
+        return base
+
+
+def _prune(folder, keep=PROFILE_KEEP):
+    paths = [os.path.join(folder, name) for name in os.listdir(folder)]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[keep * 2:]:  # a trace and a snapshot per rerun
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# Instrumentation: free when no profiler is active
+def begin_rerun(mode, rerun):
+    """Start profiling this thread's rerun for a profile_mode() value (None turns it off)."""
+    previous = getattr(_active, "profiler", None)
+    if previous is not None:
+        previous.finish()  # a rerun that stopped early never reached end_rerun()
+    _active.profiler = RerunProfiler(rerun, mode == "cprofile") if mode else None
+    return _active.profiler
+
+
+def end_rerun():
+    profiler = getattr(_active, "profiler", None)
+    _active.profiler = None
+    return profiler.finish() if profiler is not None else None
+
+
+@contextmanager
+def phase(name):
+    profiler = getattr(_active, "profiler", None)
+    if profiler is None:
+        yield
+        return
+    with profiler.phase(name):
+        yield
+
+
+def timed(name=None):
+    """Decorator recording every call of a function as a phase."""
+    def decorate(function):
+        phase_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = getattr(_active, "profiler", None)
+            if profiler is None:
+                return function(*args, **kwargs)
+            with profiler.phase(phase_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def render_panel(profiler, history):
+    """Collapsible sidebar panel for a finished rerun; history holds earlier rerun totals in ms."""
+    import streamlit as st
+
+    with st.sidebar.expander(f"⏱️ Profiler · rerun {profiler.rerun} · {profiler.total * 1000:.1f} ms"):
+        rows = ["| Phase | Calls | ms |", "|---|---:|---:|"]
+        for name, (calls, elapsed) in profiler.summary().items():
+            rows.append(f"| {name} | {calls} | {elapsed:.1f} |")
+        st.markdown("\n".join(rows))
+        if profiler.cprofile_busy:
+            st.caption("cProfile is already running in another session; showing phase timings only.")
+        if history:
+            st.caption("Recent reruns (ms): " + ", ".join(f"{total:.0f}" for total in history))
+        trace = json.dumps(profiler.trace())
+        st.download_button("Download JSON trace", data=trace, file_name=f"rerun-{profiler.rerun}.json",
+                           mime="application/json")
+        if profiler.profile is not None:
+            st.download_button("Download pstats", data=profiler.pstats_bytes(),
+                               file_name=f"rerun-{profiler.rerun}.pstats", mime="application/octet-stream")
+            st.code(profiler.top_functions(), language=None)